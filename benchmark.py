@@ -0,0 +1,503 @@
+"""Offline benchmark for process_workflow.
+
+Serves a synthetic web locally (a stand-in search engine whose results page
+uses the same markup get_google_website_button and search_company_url read,
+plus generated company sites with contact/about pages and obfuscated emails)
+and runs whole jobs against it, reporting throughput, per-stage latency,
+memory and email recall.
+
+    python benchmark.py                          # 100, 1k and 10k rows, fake driver
+    python benchmark.py --rows 100 --pool-size 1 2 4
+    python benchmark.py --rows 100 --driver chrome --politeness-scale 1
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import urlencode, urljoin, urlparse, parse_qs
+
+import httpx
+import lxml.html
+import pandas as pd
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.keys import Keys
+
+import main
+import providers
+from metrics import StageHistograms
+
+BENCH_CITY = "London"
+BENCH_COUNTRY = "UK"
+DEFAULT_ROWS = [100, 1000, 10000]
+# How often the parent checks whether a run's child process has died.
+RESULT_POLL_SECONDS = 1
+
+ADJECTIVES = ["Northern", "Crimson", "Silver", "Rapid", "Golden", "Harbour", "Summit", "Oak", "Bright", "Granite",
+              "Cedar", "Quantum", "Atlas", "Beacon", "Coastal", "Meridian", "Pioneer", "Royal", "Vertex", "Willow"]
+NOUNS = ["Plumbing", "Logistics", "Bakery", "Dental", "Joinery", "Printing", "Roofing", "Catering", "Optics", "Motors",
+         "Textiles", "Analytics", "Architects", "Florists", "Lettings", "Tutors", "Kitchens", "Glazing", "Studios", "Cleaners"]
+SUFFIXES = ["Ltd", "Limited", "& Sons", "Co", "Group", "Services", "Bros", "UK"]
+DIRECTORY_LINKS = ["https://www.yell.com/biz/{slug}", "https://www.facebook.com/{slug}",
+                   "https://www.linkedin.com/company/{slug}", "https://www.trustpilot.com/review/{slug}"]
+FILLER = ("We are a family run business serving customers across the region with friendly, reliable service. "
+          "Our experienced team is fully insured and committed to quality workmanship on every job. ")
+
+
+def generate_corpus(rows, seed=42):
+    """Builds rows companies, each with a search-result variant, a site layout and its planted emails."""
+    rng = random.Random(seed)
+    companies = []
+    for i in range(rows):
+        name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i:05d} {rng.choice(SUFFIXES)}"
+        slug = f"company-{i:05d}"
+        search = rng.choices(["button", "title", "fallback", "none"], weights=[30, 50, 10, 10])[0]
+        layout = rng.choices(["homepage", "contact", "about", "js", "none"], weights=[40, 30, 10, 10, 10])[0]
+        email = f"{rng.choice(['info', 'hello', 'sales', 'office'])}@{slug}.co.uk"
+        expected = {email} if search != "none" and layout != "none" else set()
+        companies.append({
+            "name": name, "slug": slug, "search": search, "layout": layout,
+            "email": email, "expected": expected,
+        })
+    return companies
+
+
+def _page(title, body, paragraphs=6):
+    filler = "".join(f"<p>{FILLER}</p>" for _ in range(paragraphs))
+    return (f"<!DOCTYPE html><html><head><title>{escape(title)}</title>"
+            f"<style>.logo{{background:url(logo@2x.png)}}</style></head>"
+            f"<body><nav>{body[0]}</nav><main>{filler}{body[1]}</main>"
+            f"<footer><p>&copy; {escape(title)}</p></footer></body></html>")
+
+
+class FakeWeb:
+    """The synthetic search engine and company sites, served from a local thread."""
+
+    def __init__(self, companies, latency=0.0):
+        self.companies = companies
+        self.by_name = {c["name"].lower(): c for c in companies}
+        self.by_slug = {c["slug"]: c for c in companies}
+        self.latency = latency
+        self.server = None
+        self.base_url = None
+
+    def site_url(self, company):
+        return f"{self.base_url}/site/{company['slug']}/"
+
+    def start(self):
+        web = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if web.latency:
+                    time.sleep(web.latency)
+                status, body = web.render(self.path)
+                data = body.encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The fetcher cancels requests it no longer needs.
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def render(self, path):
+        parsed = urlparse(path)
+        if parsed.path == "/":
+            return 200, ('<html><body><form action="/search" method="get">'
+                         '<input name="q" type="text"><button type="submit">Search</button></form></body></html>')
+        if parsed.path == "/search":
+            return 200, self.render_search(parse_qs(parsed.query).get("q", [""])[0])
+        parts = parsed.path.strip("/").split("/")
+        if len(parts) >= 2 and parts[0] == "site" and parts[1] in self.by_slug:
+            return self.render_site(self.by_slug[parts[1]], parts[2] if len(parts) > 2 else "")
+        return 404, "<html><body><h1>Not Found</h1></body></html>"
+
+    def render_search(self, query):
+        query = query.lower()
+        company = next((c for name, c in self.by_name.items() if query.startswith(name)), None)
+        if not company:
+            return "<html><body><div id='search'></div></body></html>"
+
+        directory = "".join(
+            f'<div class="g"><a href="{link.format(slug=company["slug"])}"><h3>{escape(company["name"])} - Reviews</h3></a></div>'
+            for link in DIRECTORY_LINKS
+        )
+        site = self.site_url(company)
+        panel = ""
+        if company["search"] == "button":
+            panel = f'<div role="heading">{escape(company["name"])}</div><a aria-label="Website" href="{site}">Website</a>'
+            organic = directory
+        elif company["search"] == "title":
+            organic = directory + f'<div class="g"><a href="{site}"><h3>{escape(company["name"])} | Official Site</h3></a></div>'
+        elif company["search"] == "fallback":
+            organic = f'<div class="g"><a href="{site}"><h3>Home</h3></a></div>' + directory
+        else:
+            organic = directory
+        return f"<html><body>{panel}<div id='search'>{organic}</div></body></html>"
+
+    def render_site(self, company, page):
+        base = f"/site/{company['slug']}"
+        nav = f'<a href="{base}/">Home</a> <a href="{base}/contact-us">Contact us</a> <a href="{base}/about-us">About us</a>'
+        local, domain = company["email"].split("@")
+        layout = company["layout"]
+
+        if layout == "js" and page == "":
+            return 200, ('<html><head><title>App</title></head><body><div id="root"></div>'
+                         f'<script>document.getElementById("root").innerHTML = "<a href=\\"mailto:{company["email"]}\\">Email us</a>";</script>'
+                         '</body></html>')
+
+        content = ""
+        if page == "" and layout == "homepage":
+            content = f'<p>Email: <a href="mailto:{company["email"]}">{company["email"]}</a></p>'
+        elif page == "contact-us" and layout == "contact":
+            content = f"<p>Write to {local} [at] {domain.rsplit('.', 2)[0]}.{domain.split('.', 1)[1]}</p>"
+        elif page == "about-us" and layout == "about":
+            content = f"<p>Reach the office: {local} @ {domain}</p>"
+        elif page not in ("", "contact-us", "about-us"):
+            return 404, "<html><body><h1>Not Found</h1></body></html>"
+        content += '<p>Error tracking: 3f2a@o123.ingest.sentry.io</p>'
+        return 200, _page(f"{company['name']} {page}".strip(), (nav, content))
+
+
+class FakeElement:
+    def __init__(self, driver, element):
+        self._driver = driver
+        self._element = element
+        self._typed = ""
+
+    @property
+    def text(self):
+        return " ".join(self._element.text_content().split())
+
+    def get_attribute(self, name):
+        return self._element.get(name)
+
+    def is_displayed(self):
+        return True
+
+    def click(self):
+        href = self._element.get("href")
+        if href:
+            self._driver.get(href)
+
+    def clear(self):
+        self._typed = ""
+
+    def send_keys(self, *keys):
+        for key in keys:
+            if key == Keys.RETURN:
+                form = next((el for el in self._element.iterancestors("form")), None)
+                action = urljoin(self._driver.current_url, form.get("action", "")) if form is not None else self._driver.current_url
+                self._driver.get(f"{action}?{urlencode({self._element.get('name'): self._typed})}")
+            else:
+                self._typed += key
+
+    def find_element(self, by, value):
+        return _first(self.find_elements(by, value), by, value)
+
+    def find_elements(self, by, value):
+        return [FakeElement(self._driver, el) for el in _select(self._element, by, value)]
+
+
+class FakeDriver:
+    """Just enough of the WebDriver API for process_workflow, backed by plain HTTP.
+
+    Has no JavaScript engine and no rendering cost, so it measures the
+    pipeline's own overhead rather than Chrome's. Tabs opened with
+    window.open or sent elsewhere through window.location load in the
+    background, like a browser's would.
+    """
+
+    def __init__(self):
+        self._client = httpx.Client(timeout=10, follow_redirects=True)
+        self._loader = ThreadPoolExecutor(max_workers=4)
+        self._tabs = {"tab-0": None}
+        self._tab_ids = itertools.count(1)
+        self.current_window_handle = "tab-0"
+        self.current_url = None
+        self.page_source = ""
+        self._root = None
+        self.switch_to = SimpleNamespace(window=self._switch_to_window)
+
+    def _load(self, url):
+        response = self._client.get(url)
+        return str(response.url), response.text
+
+    def get(self, url):
+        self._tabs[self.current_window_handle] = None
+        self._show(self._load(url))
+
+    def _show(self, page):
+        self.current_url, self.page_source = page
+        self._root = None
+
+    @property
+    def window_handles(self):
+        return list(self._tabs)
+
+    def _switch_to_window(self, handle):
+        # A tab still holding its load (a future) shows that page when
+        # switched back to; closed tabs are not brought back.
+        current = self._tabs.get(self.current_window_handle)
+        if self.current_window_handle in self._tabs and not isinstance(current, Future):
+            self._tabs[self.current_window_handle] = (self.current_url, self.page_source)
+        page = self._tabs[handle]
+        self.current_window_handle = handle
+        self._show(page.result() if hasattr(page, "result") else page or (None, ""))
+
+    def close(self):
+        self._tabs.pop(self.current_window_handle, None)
+
+    def refresh(self):
+        if self.current_url:
+            self.get(self.current_url)
+
+    def execute_script(self, script, *args):
+        if script.startswith("window.open"):
+            url = args[0] if args else "about:blank"
+            page = ("about:blank", "") if url == "about:blank" else self._loader.submit(self._load, url)
+            self._tabs[f"tab-{next(self._tab_ids)}"] = page
+        elif script.startswith("window.location"):
+            self._tabs[self.current_window_handle] = self._loader.submit(self._load, args[0])
+        elif "document.readyState" in script:
+            # waits.wait_until_ready: pages are loaded in full by get() and
+            # fetch no subresources, so only the selector check can be pending.
+            selectors = args[0] if args else []
+            found = not selectors or any(self.find_elements("css selector", selector) for selector in selectors)
+            return ["complete" if self.current_url else "loading", 0, found]
+        return None
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def quit(self):
+        self._loader.shutdown(wait=False, cancel_futures=True)
+        self._client.close()
+
+    def _tree(self):
+        if self._root is None:
+            self._root = lxml.html.document_fromstring(self.page_source or "<html></html>")
+            self._root.make_links_absolute(self.current_url, resolve_base_href=False)
+        return self._root
+
+    def find_element(self, by, value):
+        return _first(self.find_elements(by, value), by, value)
+
+    def find_elements(self, by, value):
+        return [FakeElement(self, el) for el in _select(self._tree(), by, value)]
+
+
+def _select(element, by, value):
+    if by == "xpath":
+        return [el for el in element.xpath(value) if not isinstance(el, str)]
+    if by == "id":
+        return element.xpath(".//*[@id=$v]", v=value)
+    if by == "name":
+        return element.xpath(".//*[@name=$v]", v=value)
+    if by == "tag name":
+        return element.xpath(f".//{value}")
+    if by == "css selector":
+        return element.xpath(_css_xpath(value))
+    raise ValueError(f"Unsupported locator: {by}")
+
+
+_SIMPLE_CSS = re.compile(r'^([\w-]*)(?:#([\w-]+))?(?:\.([\w-]+))?(?:\[([\w-]+)="([^"]*)"\])?$')
+
+
+def _css_xpath(selector):
+    """XPath for the simple selectors main.py waits on: tag, #id, .class and [attr="value"]."""
+    match = _SIMPLE_CSS.match(selector.strip())
+    if not match or not any(match.groups()):
+        raise ValueError(f"Unsupported CSS selector: {selector}")
+    tag, element_id, css_class, attribute, value = match.groups()
+    xpath = f".//{tag or '*'}"
+    if element_id:
+        xpath += f"[@id='{element_id}']"
+    if css_class:
+        xpath += f"[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+    if attribute:
+        xpath += f"[@{attribute}='{value}']"
+    return xpath
+
+
+def _first(elements, by, value):
+    if not elements:
+        raise NoSuchElementException(f"No element for {by}={value}")
+    return elements[0]
+
+
+def score(companies, output_file, site_url):
+    df = pd.read_excel(output_file) if output_file.endswith(".xlsx") else pd.read_csv(output_file)
+    expected_total = found_total = false_positives = websites_ok = 0
+    for company, (_, row) in zip(companies, df.iterrows()):
+        found = {e.strip() for e in str(row.get("Email", "")).split(",") if "@" in e}
+        expected_total += len(company["expected"])
+        found_total += len(found & company["expected"])
+        false_positives += len(found - company["expected"])
+        if company["search"] != "none" and str(row.get("Website", "")).startswith(site_url(company)):
+            websites_ok += 1
+    return {
+        "email_recall": found_total / expected_total if expected_total else 1.0,
+        "false_positive_emails": false_positives,
+        "websites_found": websites_ok,
+    }
+
+
+def run_once(base_url, companies, pool_size, driver_kind, http_fast_path, politeness_scale, search_providers, results):
+    """Runs one job in a fresh process so peak memory belongs to this run alone."""
+    main.SEARCH_ENGINE = base_url
+    if driver_kind == "fake":
+        main.init_driver = FakeDriver
+    main.SEARCH_INTERVAL *= politeness_scale
+    main.SITE_PAGE_INTERVAL *= politeness_scale
+
+    metrics = StageHistograms()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        input_file = os.path.join(workdir, "companies.xlsx")
+        output_file = os.path.join(workdir, "companies_updated.xlsx")
+        pd.DataFrame({"Name": [c["name"] for c in companies]}).to_excel(input_file, index=False)
+        if "local" in search_providers:
+            # Half the findable companies are "already known".
+            providers.KNOWN_DOMAINS_FILE = os.path.join(workdir, "known_domains.csv")
+            known = [c for c in companies[::2] if c["search"] != "none"]
+            pd.DataFrame({"Name": [c["name"] for c in known], "Website": [f"{base_url}/site/{c['slug']}/" for c in known]}).to_csv(
+                providers.KNOWN_DOMAINS_FILE, index=False
+            )
+
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            main.process_workflow(
+                input_file=input_file, city=BENCH_CITY, country=BENCH_COUNTRY,
+                pool_size=pool_size, http_fast_path=http_fast_path,
+                use_cache=False, resume=False, output_file=output_file, metrics=metrics,
+                search_providers=search_providers
+            )
+        elapsed = time.perf_counter() - start
+
+        site_url = lambda c: f"{base_url}/site/{c['slug']}/"
+        results.put({
+            "rows": len(companies),
+            "pool_size": pool_size,
+            "driver": driver_kind,
+            "http_fast_path": http_fast_path,
+            "search_providers": search_providers,
+            "elapsed_s": elapsed,
+            "rows_per_minute": len(companies) / elapsed * 60 if elapsed else 0.0,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "stages": metrics.summary(),
+            **score(companies, output_file, site_url),
+        })
+
+
+def wait_for_result(process, results_queue):
+    """The run's result, or None if its process exited without one (the
+    child's traceback is already on stderr)."""
+    while True:
+        try:
+            return results_queue.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            if process.exitcode is None:
+                continue
+        # The child may have exited just after putting its result.
+        try:
+            return results_queue.get(timeout=RESULT_POLL_SECONDS)
+        except queue.Empty:
+            return None
+
+
+def print_report(result):
+    mode = "http+browser" if result["http_fast_path"] else "browser only"
+    print(f"\n{result['rows']} rows | pool {result['pool_size']} | {result['driver']} driver | {mode} | search: {'+'.join(result['search_providers'])}")
+    print(f"  elapsed {result['elapsed_s']:.1f}s  |  {result['rows_per_minute']:.0f} rows/min  |  peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"  email recall {result['email_recall']:.1%}  |  false positives {result['false_positive_emails']}  |  websites found {result['websites_found']}")
+    print(f"  {'stage':<16}{'rows':>8}{'mean s':>10}{'p50 s':>10}{'p95 s':>10}{'total s':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:<16}{stats['count']:>8}{stats['mean']:>10.3f}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['total']:>10.1f}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark process_workflow against a local synthetic web.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="sheet sizes to run")
+    parser.add_argument("--pool-size", type=int, nargs="+", default=[1], help="browser pool sizes to compare")
+    parser.add_argument("--fetch", choices=["http", "browser", "both"], default="http",
+                        help="use the HTTP fast path, the browser only, or compare both")
+    parser.add_argument("--driver", choices=["fake", "chrome"], default="fake",
+                        help="fake: HTTP-backed WebDriver stand-in; chrome: real undetected Chrome")
+    parser.add_argument("--latency-ms", type=float, default=20, help="artificial server latency per request")
+    parser.add_argument("--politeness-scale", type=float, default=0.0,
+                        help="multiplier for the per-host politeness intervals (0 disables them)")
+    parser.add_argument("--providers", nargs="+", default=["browser"], choices=providers.DEFAULT_PROVIDERS,
+                        help="search providers, in order (domain_guess needs real DNS, so it finds nothing here)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args()
+
+    fetch_modes = {"http": [True], "browser": [False], "both": [True, False]}[args.fetch]
+    ctx = multiprocessing.get_context("fork")
+    results = []
+    failed = 0
+
+    for rows in args.rows:
+        companies = generate_corpus(rows, args.seed)
+        web = FakeWeb(companies, args.latency_ms / 1000).start()
+        try:
+            for pool_size in args.pool_size:
+                for http_fast_path in fetch_modes:
+                    results_queue = ctx.Queue()
+                    process = ctx.Process(target=run_once, args=(
+                        web.base_url, companies, pool_size, args.driver, http_fast_path, args.politeness_scale, args.providers, results_queue
+                    ))
+                    process.start()
+                    result = wait_for_result(process, results_queue)
+                    process.join()
+                    if result is None:
+                        failed += 1
+                        mode = "http+browser" if http_fast_path else "browser only"
+                        print(f"\n{rows} rows | pool {pool_size} | {args.driver} driver | {mode}: run failed (exit code {process.exitcode})")
+                        continue
+                    print_report(result)
+                    results.append(result)
+        finally:
+            web.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if failed:
+        sys.exit(f"{failed} run(s) failed")
+
+
+if __name__ == "__main__":
+    main_cli()
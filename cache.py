@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit
+
+CACHE_DB = 'scraper_cache.db'
+RESULT_CACHE_TTL_DAYS = 30
+NOT_FOUND_TTL_DAYS = 3
+# Bumped whenever make_key changes meaning; rows under any other prefix are
+# dropped on open, since they may have been stored for a different company.
+RESULT_KEY_VERSION = 'v2'
+
+
+class ResultCache:
+    """On-disk cache of resolved companies, keyed by company identity + location.
+
+    Stores the website, the email string and the method that found them so a
+    re-uploaded company can skip both the search and the site visit.
+    "Not Found" results expire sooner than hits so they get retried.
+    """
+
+    def __init__(self, path=CACHE_DB, ttl_days=RESULT_CACHE_TTL_DAYS, not_found_ttl_days=NOT_FOUND_TTL_DAYS):
+        self.ttl = ttl_days * 86400
+        self.not_found_ttl = min(not_found_ttl_days, ttl_days) * 86400
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                cache_key TEXT PRIMARY KEY,
+                website TEXT,
+                email TEXT,
+                method TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("DELETE FROM results WHERE cache_key NOT LIKE ?", (f"{RESULT_KEY_VERSION}|%",))
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(identity, location):
+        """identity must tell companies apart (see main.company_identity); a
+        lossy key would serve one company's result to another for the TTL."""
+        return f"{RESULT_KEY_VERSION}|{identity}|{' '.join(str(location).lower().split())}"
+
+    def get(self, key):
+        """Returns a dict with website, email, method and age, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT website, email, method, updated_at FROM results WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+
+        website, email, method, updated_at = row
+        age = time.time() - updated_at
+        ttl = self.not_found_ttl if email == "Not Found" else self.ttl
+        if age > ttl:
+            return None
+        return {"website": website, "email": email, "method": method, "age": age}
+
+    def put(self, key, website, email, method):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (cache_key, website, email, method, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, website, email, method, time.time())
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+PAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+PAGE_CACHE_FRESH_HOURS = 24
+
+
+def normalize_url(url):
+    """Cache key for a page: lowercased scheme and host, no default port or fragment, "/" for an empty path."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+
+
+class PageCache:
+    """On-disk LRU cache of fetched HTML, shared by every job on the machine.
+
+    Pages younger than fresh_hours are served as is; older ones are
+    revalidated with their ETag / Last-Modified, so an unchanged page costs a
+    304. Bodies are stored compressed and the least recently used pages are
+    evicted once the total goes over max_bytes.
+    """
+
+    def __init__(self, path=CACHE_DB, max_bytes=PAGE_CACHE_MAX_BYTES, fresh_hours=PAGE_CACHE_FRESH_HOURS):
+        self.max_bytes = max_bytes
+        self.fresh = fresh_hours * 3600
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used)")
+        self._conn.commit()
+
+    def get(self, url):
+        """Returns a dict with html, etag, last_modified and fresh, or None."""
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+            self._conn.execute("UPDATE pages SET last_used = ? WHERE url = ?", (time.time(), key))
+            self._conn.commit()
+
+        body, etag, last_modified, fetched_at = row
+        return {
+            "html": zlib.decompress(body).decode('utf-8'),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() - fetched_at < self.fresh,
+        }
+
+    def put(self, url, html, etag=None, last_modified=None):
+        body = zlib.compress(html.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, size, etag, last_modified, fetched_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), body, len(body), etag, last_modified, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def revalidated(self, url):
+        """Marks a cached page as confirmed unchanged by the server (a 304)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ?, last_used = ? WHERE url = ?", (now, now, normalize_url(url)))
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used pages until the cache is back to 90% of its budget.
+        excess = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY last_used"):
+            if freed >= excess:
+                break
+            doomed.append((url,))
+            freed += size
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", doomed)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
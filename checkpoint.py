@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import threading
+
+
+def checkpoint_path(output_file):
+    return f"{os.path.splitext(output_file)[0]}.checkpoint.jsonl"
+
+
+def input_fingerprint(input_file, location):
+    """Identifies an input sheet + location so a checkpoint is only reused for the same job."""
+    digest = hashlib.sha1(' '.join(str(location).lower().split()).encode())
+    with open(input_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Append-only JSONL log of finished rows, keyed by row index.
+
+    The first line is a header holding the input fingerprint; every other
+    line is one finished row. A checkpoint written for a different input is
+    discarded, and a truncated last line from a crash is ignored.
+    """
+
+    def __init__(self, path, fingerprint, resume=True):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed = {}
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self.completed = self._load()
+
+        # Rewrite compactly so a half-written line from a crash never
+        # gets glued onto the next record.
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write({"fingerprint": fingerprint})
+        for index, values in self.completed.items():
+            self._write({"index": index, **values})
+        self._file.flush()
+
+    def _load(self):
+        completed = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get("fingerprint") != self.fingerprint:
+                    return {}
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    index = record.pop("index", None)
+                    if index is not None:
+                        completed[index] = record
+        except (OSError, ValueError):
+            return {}
+        return completed
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, default=str) + "\n")
+
+    def record(self, index, **values):
+        with self._lock:
+            self.completed[index] = values
+            self._write({"index": index, **values})
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
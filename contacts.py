@@ -0,0 +1,155 @@
+import re
+from urllib.parse import urljoin, urlparse, unquote
+
+# Most pages loaded per site while looking for a contact email.
+CONTACT_CRAWL_BUDGET = 4
+# Guessed when neither the page's links nor the sitemap turn up a contact page.
+WELL_KNOWN_PATHS = ['/contact', '/contact-us', '/impressum', '/about-us']
+# Child sitemaps followed from a sitemap index, and URLs read per sitemap.
+SITEMAP_CHILDREN = 2
+SITEMAP_MAX_URLS = 5000
+
+# How strongly a keyword in a link's path or text suggests a page with the
+# company's email. Legal notices are included because in several countries
+# they must carry one.
+LINK_KEYWORDS = {
+    'contact': 10, 'kontakt': 10, 'contacto': 10, 'contato': 10, 'contatti': 10, 'contactez': 10,
+    'get-in-touch': 9, 'get in touch': 9, 'reach-us': 9, 'reach us': 9, 'enquir': 8, 'inquir': 8,
+    'اتصل': 10, 'تواصل': 10,
+    'impressum': 7, 'imprint': 7, 'legal-notice': 6, 'mentions-legales': 6, 'aviso-legal': 6,
+    'about': 5, 'ueber-uns': 5, 'uber-uns': 5, 'über uns': 5, 'über-uns': 5, 'quienes-somos': 5,
+    'qui-sommes-nous': 5, 'chi-siamo': 5, 'sobre': 4, 'من نحن': 5,
+    'privacy': 1,
+}
+# A candidate scoring this much is taken to be the contact page; below it
+# the sitemap and well-known paths are consulted as well.
+CONTACT_SCORE = 10
+FOOTER_BONUS = 2
+GUESS_PENALTY = 3
+
+_KEYWORDS = re.compile('|'.join(re.escape(keyword) for keyword in sorted(LINK_KEYWORDS, key=len, reverse=True)))
+_SKIP_EXTENSIONS = re.compile(r'\.(?:pdf|jpe?g|png|gif|svg|webp|zip|docx?|xlsx?|mp4|mp3)$', re.IGNORECASE)
+_DATED_PATH = re.compile(r'/(?:19|20)\d\d/')
+_ROBOTS_SITEMAP = re.compile(r'^\s*sitemap:\s*(\S+)', re.IGNORECASE | re.MULTILINE)
+_SITEMAP_LOC = re.compile(r'<loc>\s*(?:<!\[CDATA\[)?\s*(.*?)\s*(?:\]\]>)?\s*</loc>', re.IGNORECASE | re.DOTALL)
+
+
+def _site(host):
+    host = (host or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def _keyword_score(value):
+    return max((LINK_KEYWORDS[match] for match in _KEYWORDS.findall(value)), default=0)
+
+
+def score_link(path, text='', in_footer=False):
+    """Scores a same-site link by its path and text; 0 when neither has a keyword.
+
+    The better of path and text counts fully and the other half; footer
+    links get FOOTER_BONUS, and deep or dated (blog-like) paths lose points.
+    """
+    path = unquote(path).lower().replace('_', '-')
+    text = ' '.join(text.lower().split())
+    path_score, text_score = _keyword_score(path), _keyword_score(text)
+    if not path_score and not text_score:
+        return 0
+    score = max(path_score, text_score) + min(path_score, text_score) / 2
+    score -= path.strip('/').count('/')
+    if _DATED_PATH.search(path):
+        score -= 3
+    if in_footer:
+        score += FOOTER_BONUS
+    return score
+
+
+def _same_site_url(href, base_url):
+    """The absolute, fragment-free URL for href if it is a page on base_url's site, else None."""
+    if not href or href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
+        return None
+    url = urljoin(base_url, href.strip()).split('#', 1)[0]
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or _site(parsed.hostname) != _site(urlparse(base_url).hostname):
+        return None
+    if _SKIP_EXTENSIONS.search(parsed.path) or url.rstrip('/') == base_url.split('#', 1)[0].rstrip('/'):
+        return None
+    return url
+
+
+def _add(candidates, url, score):
+    key = url.rstrip('/')
+    if score > 0 and (key not in candidates or score > candidates[key][0]):
+        order = candidates[key][1] if key in candidates else len(candidates)
+        candidates[key] = (score, order, url)
+
+
+def _ranked(candidates):
+    return [url for _, _, url in sorted(candidates.values(), key=lambda item: (-item[0], item[1]))]
+
+
+def link_candidates(anchors, base_url):
+    """{url key: (score, order, url)} for the page's same-site links that look like contact or about pages."""
+    candidates = {}
+    for href, text, _, in_footer in anchors:
+        url = _same_site_url(href, base_url)
+        if url:
+            _add(candidates, url, score_link(urlparse(url).path, text, in_footer))
+    return candidates
+
+
+def sitemap_urls(fetcher, base_url):
+    """Page URLs on the site listed in /sitemap.xml and the sitemaps named in
+    robots.txt, following up to SITEMAP_CHILDREN sitemaps from an index."""
+    root = urljoin(base_url, '/')
+    robots, sitemap = fetcher.fetch_many([urljoin(root, '/robots.txt'), urljoin(root, '/sitemap.xml')])
+    sitemaps = [sitemap] if sitemap else []
+    listed = _ROBOTS_SITEMAP.findall(robots or '')
+    if listed:
+        sitemaps += fetcher.fetch_many([url for url in listed[:SITEMAP_CHILDREN] if url.rstrip('/') != urljoin(root, '/sitemap.xml')])
+
+    pages, children = [], []
+    for body in sitemaps:
+        if not body or '<loc' not in body.lower():
+            continue
+        for loc in _SITEMAP_LOC.findall(body)[:SITEMAP_MAX_URLS]:
+            (children if loc.lower().split('?', 1)[0].endswith('.xml') else pages).append(loc)
+
+    if children:
+        # Page sitemaps are where contact pages are listed; posts and products are not.
+        children.sort(key=lambda url: 'page' not in url.lower())
+        for body in fetcher.fetch_many(children[:SITEMAP_CHILDREN]):
+            pages += _SITEMAP_LOC.findall(body or '')[:SITEMAP_MAX_URLS]
+    return pages
+
+
+def guessed_urls(anchors, base_url):
+    """Keys (as in link_candidates) of the WELL_KNOWN_PATHS URLs that
+    discover_contact_pages may add for base_url without the page linking them."""
+    linked = link_candidates(anchors, base_url)
+    return {url.rstrip('/') for url in (urljoin(base_url, path) for path in WELL_KNOWN_PATHS)} - linked.keys()
+
+
+def discover_contact_pages(anchors, base_url, fetcher=None, budget=CONTACT_CRAWL_BUDGET):
+    """Ranks the pages of a site most likely to show its email, best first,
+    at most budget of them.
+
+    The page's own links come first. Only when none of them is clearly a
+    contact page is the sitemap read (over HTTP, when a fetcher is given),
+    and then well-known paths are guessed, ranked below what was linked.
+    """
+    candidates = link_candidates(anchors, base_url)
+    strong = lambda: any(score >= CONTACT_SCORE for score, _, _ in candidates.values())
+
+    if fetcher and not strong():
+        for loc in sitemap_urls(fetcher, base_url):
+            url = _same_site_url(loc, base_url)
+            if url:
+                _add(candidates, url, score_link(urlparse(url).path))
+
+    if not strong():
+        for path in WELL_KNOWN_PATHS:
+            url = urljoin(base_url, path)
+            if url.rstrip('/') not in candidates:
+                _add(candidates, url, score_link(path) - GUESS_PENALTY)
+
+    return _ranked(candidates)[:budget]
@@ -0,0 +1,94 @@
+import os
+import re
+from urllib.parse import urlparse
+
+BLOCKLIST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blocked_domains.txt')
+
+# Used when the blocklist file is missing.
+DEFAULT_BLOCKED_DOMAINS = [
+    'google.*', 'microsoft.*', 'yahoo.*', 'bing.*', 'facebook.*', 'linkedin.*', 'instagram.*', 'twitter.*',
+    'youtube.*', 'pinterest.*', 'yell.com', 'checkatrade.com', 'trustpilot.com', 'thomsonlocal.com',
+    'company-information.service.gov.uk', 'companieshouse.gov.uk', 'thegazette.co.uk', 'endole.co.uk',
+    'pomanda.com', 'bizify.co.uk', '192.com', 'wikipedia.org', 'gov.qa', 'yellowpages.*', 'whitepages.*',
+    'yelp.*', 'bbb.org', 'dnb.com', 'bloomberg.com', 'reuters.com', 'crunchbase.com', 'zoominfo.com',
+    'kompass.com', 'europages.*', 'alibaba.com', 'indiamart.com', 'justdial.com', 'sulekha.com',
+    'foursquare.com', 'manta.com', 'bizapedia.com', 'corporationwiki.com', 'spoke.com', 'vault.com',
+    'glassdoor.*', 'indeed.*', 'naviqatar.com', 'waze.com', 'wanderlog.com'
+]
+
+# A "brand.*" entry matches when at most this many labels follow the brand,
+# i.e. brand.com and brand.co.uk but not brand.example.org.au.
+_MAX_SUFFIX_LABELS = 2
+
+
+class DomainIndex:
+    """Host blocklist with exact-suffix and any-TLD brand entries.
+
+    "example.com" blocks that host and its subdomains; "example.*" blocks the
+    example label under any TLD. Lookups walk the host's labels once against
+    two sets, so they cost the same however long the list gets.
+    """
+
+    def __init__(self, entries):
+        self.domains = set()
+        self.brands = set()
+        for entry in entries:
+            entry = entry.strip().lower().strip('.')
+            if not entry:
+                continue
+            if entry.endswith('.*'):
+                self.brands.add(entry[:-2])
+            else:
+                self.domains.add(entry)
+
+    @classmethod
+    def from_file(cls, path=BLOCKLIST_FILE):
+        """Loads one entry per line ('#' starts a comment); falls back to the defaults if the file is missing."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                return cls(line.split('#', 1)[0] for line in f)
+        except FileNotFoundError:
+            return cls(DEFAULT_BLOCKED_DOMAINS)
+
+    def is_blocked(self, host):
+        labels = host.lower().rstrip('.').split('.')
+        for i, label in enumerate(labels):
+            if '.'.join(labels[i:]) in self.domains:
+                return True
+            if label in self.brands and 0 < len(labels) - i - 1 <= _MAX_SUFFIX_LABELS:
+                return True
+        return False
+
+
+def candidate_links(links, blocklist):
+    """Keeps (href, text) pairs with an http(s) URL whose host is not blocked, in order."""
+    candidates = []
+    for href, text in links:
+        if not href:
+            continue
+        parsed = urlparse(href)
+        if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+            continue
+        if blocklist.is_blocked(parsed.hostname):
+            continue
+        candidates.append((href, text.lower()))
+    return candidates
+
+
+def rank_candidates(candidates, name_tokens):
+    """Orders candidates by how many distinct name tokens their title or host
+    contains, best first; the search engine's order breaks ties.
+
+    Returns (href, score) pairs. A single regex for all tokens is run once
+    over each candidate, instead of one substring scan per token.
+    """
+    if not name_tokens:
+        return [(href, 0) for href, _ in candidates]
+
+    pattern = re.compile('|'.join(re.escape(token) for token in sorted(set(name_tokens), key=len, reverse=True)))
+    scored = []
+    for position, (href, text) in enumerate(candidates):
+        haystack = f"{text} {urlparse(href).hostname or ''}"
+        scored.append((len(set(pattern.findall(haystack))), position, href))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(href, score) for score, _, href in scored]
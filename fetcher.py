@@ -0,0 +1,155 @@
+import asyncio
+import re
+import threading
+from urllib.parse import urlparse
+
+import httpx
+
+HTTP_TIMEOUT = 10
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+MAX_CONNECTIONS = 50
+MAX_CONNECTIONS_PER_HOST = 4
+KEEPALIVE_EXPIRY = 30
+MIN_TEXT_CHARS = 100
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+
+_STRIP_BLOCKS = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_STRIP_TAGS = re.compile(r'<[^>]+>')
+_SPA_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>'
+    r'|ng-app|data-reactroot'
+    r'|enable javascript|requires javascript|javascript is disabled'
+    r'|just a moment\.\.\.|cf-browser-verification',
+    re.IGNORECASE
+)
+
+
+def looks_js_rendered(html):
+    """True when a static response is too thin to trust and needs a real browser."""
+    if not html or not html.strip():
+        return True
+    text = _STRIP_TAGS.sub(' ', _STRIP_BLOCKS.sub(' ', html))
+    if len(' '.join(text.split())) < MIN_TEXT_CHARS:
+        return True
+    return bool(_SPA_MARKERS.search(html)) and 'mailto:' not in html.lower()
+
+
+class HttpFetcher:
+    """Pooled async HTTP client for static pages, usable from plain worker threads.
+
+    Runs its own event loop in a background thread so every browser worker
+    shares one connection pool with per-host keep-alive and concurrency caps.
+    With a page_cache, fresh pages are served from it and stale ones are
+    revalidated with a conditional request.
+    """
+
+    def __init__(self, timeout=HTTP_TIMEOUT, max_bytes=MAX_RESPONSE_BYTES,
+                 max_connections=MAX_CONNECTIONS, max_per_host=MAX_CONNECTIONS_PER_HOST, page_cache=None):
+        self.page_cache = page_cache
+        self.cache_stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_per_host = max_per_host
+        self.max_connections = max_connections
+        self._host_limits = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._client = self._run(self._open())
+
+    async def _open(self):
+        return httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=httpx.Timeout(self.timeout),
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            )
+        )
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def _fetch(self, url):
+        try:
+            cached = self.page_cache.get(url) if self.page_cache else None
+            if cached and cached["fresh"]:
+                self.cache_stats["hits"] += 1
+                return cached["html"]
+
+            headers = {}
+            if cached and cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached and cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+            async with self._host_limit(url):
+                async with self._client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and cached:
+                        self.page_cache.revalidated(url)
+                        self.cache_stats["revalidated"] += 1
+                        return cached["html"]
+                    # Error pages are not the site's content; None sends the
+                    # caller to its fallback (the browser, or the next page).
+                    if not 200 <= response.status_code < 300:
+                        return None
+
+                    content_type = response.headers.get("content-type", "").lower()
+                    # Plain text is let through for robots.txt.
+                    if content_type and not any(kind in content_type for kind in ("html", "xml", "text/plain")):
+                        return None
+
+                    body = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        body.extend(chunk)
+                        if len(body) >= self.max_bytes:
+                            break
+
+                    encoding = response.encoding or "utf-8"
+                    html = bytes(body[:self.max_bytes]).decode(encoding, errors="replace")
+                    if self.page_cache and response.status_code == 200:
+                        self.cache_stats["misses"] += 1
+                        self.page_cache.put(url, html, response.headers.get("etag"), response.headers.get("last-modified"))
+                    return html
+        except Exception as e:
+            print(f"   -> HTTP fetch failed for {url}: {e}")
+            return None
+
+    def fetch(self, url):
+        """Returns the page HTML, or None if the request failed, got a non-2xx
+        status or was not HTML (or XML / plain text)."""
+        return self._run(self._fetch(url))
+
+    def submit(self, url):
+        """Starts fetching url in the background and returns a concurrent.futures.Future
+        for its HTML; cancelling the future abandons the request."""
+        return asyncio.run_coroutine_threadsafe(self._fetch(url), self._loop)
+
+    def fetch_many(self, urls):
+        """Fetches several URLs concurrently, returning HTML (or None) in the same order."""
+        async def gather():
+            return await asyncio.gather(*(self._fetch(url) for url in urls))
+        return self._run(gather())
+
+    def close(self):
+        try:
+            self._run(self._client.aclose())
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if self.page_cache:
+            self.page_cache.close()
@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+JOBS_DIR = 'jobs'
+JOBS_DB = os.path.join(JOBS_DIR, 'jobs.db')
+
+JOB_FIELDS = [
+    'job_id', 'status', 'filename', 'city', 'country', 'pool_size', 'input_path', 'output_path',
+    'total', 'processed', 'error', 'created_at', 'started_at', 'finished_at',
+    'priority', 'force_refresh', 'stop_requested', 'worker_id', 'heartbeat_at', 'stage_timings', 'enrich_mode'
+]
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Columns added after the first release; created on older databases at startup.
+_ADDED_COLUMNS = {
+    'priority': "INTEGER DEFAULT 0",
+    'force_refresh': "INTEGER DEFAULT 0",
+    'stop_requested': "INTEGER DEFAULT 0",
+    'worker_id': "TEXT",
+    'heartbeat_at': "REAL",
+    'stage_timings': "TEXT",
+    'enrich_mode': "TEXT DEFAULT 'full'",
+}
+
+
+def job_dir(job_id):
+    path = os.path.join(JOBS_DIR, job_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class JobStore:
+    """SQLite-backed record of every job: status, progress, file paths and timestamps.
+
+    It doubles as the local queue for external worker processes: workers
+    claim queued jobs atomically and write log lines back to job_logs.
+    """
+
+    def __init__(self, path=JOBS_DB):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                city TEXT,
+                country TEXT,
+                pool_size INTEGER DEFAULT 1,
+                input_path TEXT,
+                output_path TEXT,
+                total INTEGER DEFAULT 0,
+                processed INTEGER DEFAULT 0,
+                error TEXT,
+                created_at TEXT,
+                started_at TEXT,
+                finished_at TEXT
+            )
+        """)
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, definition in _ADDED_COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS job_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                message TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def now():
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def create(self, job_id, **fields):
+        fields = {"status": "queued", "created_at": self.now(), **fields, "job_id": job_id}
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        with self._lock:
+            self._conn.execute(f"INSERT INTO jobs ({columns}) VALUES ({placeholders})", list(fields.values()))
+            self._conn.commit()
+        return self.get(job_id)
+
+    def update(self, job_id, **fields):
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {', '.join(sorted(unknown))}")
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", [*fields.values(), job_id])
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list(self, limit=50):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def mark_interrupted(self):
+        """Flags jobs left active by a previous server process; their threads are gone."""
+        placeholders = ", ".join("?" for _ in ACTIVE_STATUSES)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET status = 'interrupted', finished_at = ? WHERE status IN ({placeholders})",
+                [self.now(), *ACTIVE_STATUSES]
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def queue_position(self, job_id):
+        """1-based position among queued jobs (priority first, then age), or 0 if not queued."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at, rowid"
+            ).fetchall()
+        for position, row in enumerate(rows, 1):
+            if row["job_id"] == job_id:
+                return position
+        return 0
+
+    def claim_next(self, worker_id, max_browsers):
+        """Atomically moves the next queued job to running for worker_id.
+
+        The job is only claimed if its pool fits in the browsers left over by
+        other running jobs; it is shrunk to what is free otherwise.
+        """
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                in_use = self._conn.execute(
+                    "SELECT COALESCE(SUM(pool_size), 0) FROM jobs WHERE status = 'running'"
+                ).fetchone()[0]
+                free_browsers = max_browsers - in_use
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, created_at, rowid LIMIT 1"
+                ).fetchone()
+                if not row or free_browsers < 1:
+                    self._conn.rollback()
+                    return None
+
+                pool_size = max(1, min(row["pool_size"] or 1, free_browsers))
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', worker_id = ?, pool_size = ?, heartbeat_at = ?, started_at = ? WHERE job_id = ?",
+                    (worker_id, pool_size, time.time(), self.now(), row["job_id"])
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return {**dict(row), "requested_pool_size": row["pool_size"], "pool_size": pool_size}
+
+    def stage_timings(self, limit=500):
+        """Stored stage histograms (JSON text) of the most recent jobs that recorded any."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage_timings FROM jobs WHERE stage_timings IS NOT NULL ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [row["stage_timings"] for row in rows]
+
+    def heartbeat(self, job_id):
+        self.update(job_id, heartbeat_at=time.time())
+
+    def requeue_stale(self, stale_after):
+        """Puts running jobs whose worker stopped heartbeating back in the queue."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', worker_id = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (time.time() - stale_after,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def append_log(self, job_id, message):
+        with self._lock:
+            self._conn.execute("INSERT INTO job_logs (job_id, message) VALUES (?, ?)", (job_id, message))
+            self._conn.commit()
+
+    def logs_after(self, last_id, limit=500):
+        """Log rows newer than last_id, oldest first, as (id, job_id, message) tuples."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, job_id, message FROM job_logs WHERE id > ? ORDER BY id LIMIT ?", (last_id, limit)
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def last_log_id(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM job_logs").fetchone()[0]
+
+    def cancel_queued(self, job_id):
+        """Cancels a job that no worker has claimed yet. Returns False if it already started."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                (self.now(), job_id)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def stats(self):
+        with self._lock:
+            row = self._conn.execute("""
+                SELECT
+                    SUM(status = 'running') AS running_jobs,
+                    SUM(status = 'queued') AS queued_jobs,
+                    COALESCE(SUM(CASE WHEN status = 'running' THEN pool_size END), 0) AS browsers_in_use
+                FROM jobs
+            """).fetchone()
+        return {key: row[key] or 0 for key in row.keys()}
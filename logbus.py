@@ -0,0 +1,134 @@
+import asyncio
+import bisect
+import itertools
+import threading
+from collections import deque
+
+# Lines kept per job; clients that fall further behind miss the oldest ones.
+LOG_BUFFER_LINES = 2000
+# Finished jobs whose logs stay available for late or reconnecting clients.
+FINISHED_JOBS_KEPT = 50
+# Seconds without a line before a subscriber gets a keepalive (None).
+KEEPALIVE_INTERVAL = 15
+
+TERMINAL_MARKERS = ("__COMPLETED__", "__STOPPED__", "__CANCELLED__", "__ERROR__")
+
+
+class JobLog:
+    def __init__(self, buffer_lines):
+        self.lines = deque(maxlen=buffer_lines)
+        self.last_seq = 0
+        # Last seq of the previous run; a resumed job's subscribers start
+        # after it, so the old run's end marker is not replayed.
+        self.run_start = 0
+        self.finished = False
+        self.waiters = set()
+
+    def after(self, seq):
+        """(seq, line) pairs newer than seq still in the buffer."""
+        start = bisect.bisect_right(self.lines, seq, key=lambda item: item[0])
+        return list(itertools.islice(self.lines, start, None))
+
+
+class LogBus:
+    """Per-job log lines in bounded ring buffers, numbered so clients can resume.
+
+    Workers publish from any thread; subscribers are async generators that
+    sleep on an asyncio.Event until a line arrives instead of polling. Lines
+    are numbered 1, 2, ... per job unless the publisher supplies increasing
+    numbers of its own, such as durable log row ids. A job
+    is finished once one of TERMINAL_MARKERS is published, and only the last
+    FINISHED_JOBS_KEPT finished jobs are kept.
+    """
+
+    def __init__(self, buffer_lines=LOG_BUFFER_LINES, finished_kept=FINISHED_JOBS_KEPT):
+        self.buffer_lines = buffer_lines
+        self.finished_kept = finished_kept
+        self._jobs = {}
+        self._finished = deque()
+        self._lock = threading.Lock()
+
+    def __contains__(self, job_id):
+        with self._lock:
+            return job_id in self._jobs
+
+    def open(self, job_id):
+        """Starts (or, on resume, reopens) a job's log; numbering carries on across runs."""
+        with self._lock:
+            log = self._jobs.get(job_id)
+            if log is None:
+                self._jobs[job_id] = JobLog(self.buffer_lines)
+            elif log.finished:
+                log.finished = False
+                log.run_start = log.last_seq
+                self._finished.remove(job_id)
+
+    def active(self, job_id):
+        with self._lock:
+            log = self._jobs.get(job_id)
+            return log is not None and not log.finished
+
+    def publish(self, job_id, line, seq=None):
+        """Adds a line; seq, when given, must grow across calls, and a line
+        at or below the last seq is taken as already published."""
+        with self._lock:
+            log = self._jobs.get(job_id)
+            if log is None or (seq is not None and seq <= log.last_seq):
+                return
+            log.last_seq = log.last_seq + 1 if seq is None else seq
+            log.lines.append((log.last_seq, line))
+            if line.startswith(TERMINAL_MARKERS) and not log.finished:
+                log.finished = True
+                self._finished.append(job_id)
+                while len(self._finished) > self.finished_kept:
+                    del self._jobs[self._finished.popleft()]
+            waiters = list(log.waiters)
+
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+    async def subscribe(self, job_id, after=0):
+        """Yields (seq, line) for each line after seq, waiting for new ones as
+        they are published, and None after KEEPALIVE_INTERVAL idle seconds.
+
+        Ends after a terminal marker, or if the job is dropped from the bus.
+        Lines from before the job's current run are skipped. A seq beyond
+        the last one published comes from an older numbering (the API was
+        restarted), so the current run is replayed from the start.
+        """
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            log = self._jobs.get(job_id)
+            if log is None:
+                return
+            log.waiters.add(waiter)
+            if after > log.last_seq:
+                after = 0
+            after = max(after, log.run_start)
+
+        try:
+            while True:
+                event.clear()
+                with self._lock:
+                    pending = log.after(after)
+                    done = log.finished or self._jobs.get(job_id) is not log
+
+                for seq, line in pending:
+                    after = seq
+                    yield seq, line
+                    if line.startswith(TERMINAL_MARKERS):
+                        return
+                if done:
+                    return
+                if not pending:
+                    try:
+                        await asyncio.wait_for(event.wait(), KEEPALIVE_INTERVAL)
+                    except asyncio.TimeoutError:
+                        yield None
+        finally:
+            with self._lock:
+                log.waiters.discard(waiter)
@@ -1,23 +1,117 @@
+import os
 import time
-import random
+import json
 import pandas as pd
 import re
+import queue
+import threading
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, unquote
+from fetcher import HttpFetcher, looks_js_rendered, MAX_RESPONSE_BYTES
+from cache import ResultCache, PageCache, RESULT_CACHE_TTL_DAYS, PAGE_CACHE_FRESH_HOURS
+from checkpoint import Checkpoint, checkpoint_path, input_fingerprint
+from metrics import RowTimings, StageHistograms
+from waits import HostPoliteness, wait_until_ready, WAIT_CEILINGS
+from sheets import iter_companies, iter_company_results, write_results
+from domains import DomainIndex, candidate_links, rank_candidates
+from contacts import discover_contact_pages, guessed_urls
+from postprocess import JUNK_EXTENSIONS, JUNK_EMAIL_PATTERNS, postprocess_file, format_stats
+from providers import SearchError, SearchProvider, LocalLookupProvider, DomainGuessProvider, ProviderChain, DEFAULT_PROVIDERS
 
 INPUT_FILE = 'companies.xlsx'
 OUTPUT_FILE = 'companies_updated.xlsx'
 SEARCH_ENGINE = "https://www.google.com"
-
-def init_driver():
+DEFAULT_POOL_SIZE = 1
+MAX_POOL_SIZE = 8
+USE_HTTP_FAST_PATH = True
+# Minimum spacing, in seconds, between browser requests to the same host,
+# shared by every browser in the process.
+SEARCH_INTERVAL = 2.0
+SITE_PAGE_INTERVAL = 1.0
+# Contact/about candidates loaded side by side in browser tabs.
+CONTACT_PAGE_TABS = 3
+TAB_POLL_INTERVAL = 0.05
+# Dropped from the end of a name when telling companies apart.
+LEGAL_SUFFIXES = frozenset(['ltd', 'limited', 'plc', 'llc'])
+# Rows read ahead of the browsers, per browser; the rest stay on disk.
+WORK_QUEUE_DEPTH = 4
+# Validate, normalize and score the output's emails once the job is done.
+POSTPROCESS_RESULTS = True
+# Which rows a job works on, given what the uploaded sheet already has.
+ENRICH_MODES = {
+    'full': "full refresh of every row",
+    'missing': "only rows missing a website or email",
+    'missing_email': "only rows missing an email, reusing their website",
+}
+DEFAULT_ENRICH_MODE = 'full'
+# Selectors the search code reads; results are ready once one of them exists.
+SEARCH_READY_SELECTORS = ['#search', 'div.g', 'a[aria-label="Website"]', '#captcha-form']
+# Lean browser profile: only page_source and hrefs are ever read, so images,
+# fonts, media and trackers are blocked and pages count as loaded at
+# DOMContentLoaded.
+LEAN_BROWSER = True
+HEADLESS = False
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.bmp',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.m4a', '*.ogg', '*.avi', '*.mov',
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*facebook.net*', '*connect.facebook.com*', '*hotjar.com*', '*clarity.ms*', '*hs-analytics.net*',
+    '*intercom.io*', '*tawk.to*', '*zdassets.com*', '*youtube.com/embed*', '*vimeo.com*',
+    '*maps.googleapis.com*', '*fonts.googleapis.com*', '*fonts.gstatic.com*', '*cdn.cookielaw.org*',
+]
+# Longest page_source, in characters, handed to the parsers.
+MAX_PAGE_CHARS = MAX_RESPONSE_BYTES
+# A browser is replaced by a fresh one between rows after this many page
+# loads, or once it and its child processes use this much memory (0 = never).
+DRIVER_MAX_PAGES = 300
+DRIVER_MAX_RSS_MB = 1500
+# Times a row is retried on a fresh browser after its browser died mid-row.
+ROW_CRASH_RETRIES = 1
+
+_driver_init_lock = threading.Lock()
+_politeness = HostPoliteness()
+_blocked_domains = DomainIndex.from_file()
+
+try:
+    import lxml.html
+    _LXML_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+except ImportError:
+    lxml = None
+
+_SCRIPT_BLOCKS = re.compile(r'<(script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_MAILTO_HREF = re.compile(r'^mailto:', re.IGNORECASE)
+_STANDARD_EMAIL = re.compile(r'\b[a-zA-Z0-9][a-zA-Z0-9._%+-]*@[a-zA-Z0-9][a-zA-Z0-9.-]*\.[a-zA-Z]{2,}\b', re.IGNORECASE)
+# Scanned separately on the raw HTML: one pass would drop an "[at]" address
+# whose text a spaced "@" match had already consumed.
+_SPACED_EMAIL = re.compile(
+    r'\b([a-zA-Z0-9][a-zA-Z0-9._%+-]*)\s*@\s*([a-zA-Z0-9][a-zA-Z0-9.-]*)\s*\.\s*([a-zA-Z]{2,})\b',
+    re.IGNORECASE
+)
+_BRACKETED_EMAIL = re.compile(
+    r'\b([a-zA-Z0-9][a-zA-Z0-9._%+-]*)\s*\[\s*at\s*\]\s*([a-zA-Z0-9][a-zA-Z0-9.-]*)\s*\.\s*([a-zA-Z]{2,})\b',
+    re.IGNORECASE
+)
+# lxml drops stray end tags and joins the text around them, so a space is
+# put after every end tag to keep text nodes apart as html.parser does.
+_END_TAG = re.compile(r'(</[a-zA-Z][^>]*>)')
+_FOOTER_XPATH = "//footer | //*[contains(@id, 'footer') or contains(@class, 'footer')]"
+_AT_ANCHOR = re.compile(r'@')
+_BRACKETED_AT_ANCHOR = re.compile(r'\[\s*at\s*\]', re.IGNORECASE)
+_LOCAL_PART_CHAR = re.compile(r'[a-zA-Z0-9._%+-]', re.IGNORECASE)
+_JUNK_EMAIL = re.compile('|'.join(re.escape(junk) for junk in JUNK_EMAIL_PATTERNS))
+
+def init_driver(lean=None, headless=None):
+    lean = LEAN_BROWSER if lean is None else lean
+    headless = HEADLESS if headless is None else headless
     options = uc.ChromeOptions()
 
-    # headless chrome
-    # options.add_argument("--headless=new")
+    if headless:
+        options.add_argument("--headless=new")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-gpu")
@@ -30,12 +124,147 @@ def init_driver():
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
 
+    if lean:
+        options.page_load_strategy = 'eager'
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_argument("--autoplay-policy=user-gesture-required")
+        options.add_argument("--disable-background-networking")
+        options.add_argument("--disable-component-update")
+        options.add_argument("--mute-audio")
+
     driver = uc.Chrome(options=options, version_main=142)
     driver.set_page_load_timeout(30)
+    if lean:
+        block_heavy_requests(driver)
     return driver
 
-def random_sleep(min_seconds=3, max_seconds=6):
-    time.sleep(random.uniform(min_seconds, max_seconds))
+def block_heavy_requests(driver):
+    """Has Chrome drop requests matching BLOCKED_URL_PATTERNS through DevTools."""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        print(f"   -> Could not enable request blocking: {e}")
+
+def page_html(driver):
+    """The current page_source, cut to MAX_PAGE_CHARS so huge pages cost the parsers no more than a normal one."""
+    return driver.page_source[:MAX_PAGE_CHARS]
+
+def browser_rss_mb(driver):
+    """Resident memory of the browser and its child processes, read from
+    /proc; None where that is unavailable."""
+    pid = getattr(driver, 'browser_pid', None)
+    if not pid or not os.path.isdir('/proc'):
+        return None
+
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+        pending.extend(children.get(current, []))
+    return total_kb / 1024 if total_kb else None
+
+class LazyDriver:
+    """Stands in for a Chrome driver and launches it on first use, so rows
+    resolved without a browser never start one. The launch time goes into
+    timings (when set) as "driver_start".
+
+    It also counts page loads, so the worker can recycle a browser that has
+    grown old or large (recycle_reason) or has died (alive), via restart().
+    tabs holds the handles of the contact-page tabs kept open across rows.
+    start_error holds the exception if the browser could not be launched.
+    """
+
+    def __init__(self, factory=None, max_pages=None, max_rss_mb=None):
+        self._factory = factory
+        self._driver = None
+        self.timings = None
+        self.max_pages = DRIVER_MAX_PAGES if max_pages is None else max_pages
+        self.max_rss_mb = DRIVER_MAX_RSS_MB if max_rss_mb is None else max_rss_mb
+        self.pages = 0
+        self.tabs = []
+        self.start_error = None
+
+    @property
+    def started(self):
+        return self._driver is not None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._driver is None:
+            start = time.perf_counter()
+            # undetected_chromedriver patches a shared binary on launch,
+            # so browsers are started one at a time.
+            with _driver_init_lock:
+                try:
+                    self._driver = (self._factory or init_driver)()
+                except Exception as e:
+                    self.start_error = e
+                    raise
+            if self.timings:
+                self.timings.add("driver_start", time.perf_counter() - start)
+        return getattr(self._driver, name)
+
+    def get(self, url):
+        self.pages += 1
+        return self.__getattr__('get')(url)
+
+    def alive(self):
+        """False when the browser was started but no longer answers."""
+        if self._driver is None:
+            return True
+        try:
+            self._driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    def recycle_reason(self):
+        """Why the browser should be replaced before the next row, or None."""
+        if self._driver is None:
+            return None
+        if self.max_pages and self.pages >= self.max_pages:
+            return f"{self.pages} page loads"
+        rss = browser_rss_mb(self._driver) if self.max_rss_mb else None
+        if rss and rss >= self.max_rss_mb:
+            return f"{rss:.0f} MB in use"
+        return None
+
+    def restart(self):
+        """Quits the browser, dead or not; the next use launches a fresh one."""
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception:
+                pass
+        self._driver = None
+        self.pages = 0
+        self.tabs = []
+        self.start_error = None
+
+    def quit(self):
+        if self._driver is not None:
+            self._driver.quit()
 
 def handle_google_consent(driver):
     """Clicks 'Accept All' cookie buttons."""
@@ -58,79 +287,127 @@ def handle_google_consent(driver):
             except: continue
     except: pass
 
-def extract_emails_from_html(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    found_emails = set()
+def _find_emails_near_anchors(pattern, text, anchors=_AT_ANCHOR):
+    """Same result as pattern.findall(text) for the email patterns above.
+
+    Every match needs an anchor ('@', or '[at]' for _BRACKETED_EMAIL), so
+    instead of letting the regex try every word boundary on the page, only
+    the few start positions directly before each anchor are tried.
+    """
+    results = []
+    pos = 0
+    for anchor in anchors.finditer(text):
+        at = anchor.start()
+        if at < pos:
+            continue
 
-    for script in soup(['script', 'style', 'noscript']):
-        script.decompose()
+        start = at
+        while start > pos and text[start - 1].isspace():
+            start -= 1
+        while start > pos and _LOCAL_PART_CHAR.match(text, start - 1):
+            start -= 1
+
+        for candidate in range(start, at):
+            match = pattern.match(text, candidate)
+            if match:
+                results.append(match.groups() if pattern.groups else match.group(0))
+                pos = match.end()
+                break
+    return results
 
-    for a in soup.find_all('a', href=True):
-        href = a['href']
-        if href.lower().startswith('mailto:'):
-            email = unquote(href.split(':')[1].split('?')[0]).strip()
-            if email and '@' in email:
-                found_emails.add(email)
+def parse_page(html_content):
+    """Parses a page once. Returns (anchors, visible text).
 
-    text_content = soup.get_text(separator=' ')
+    anchors is a list of (href, link text, in_noscript, in_footer) for every
+    <a href>. Script and style content is left out of both; noscript content
+    is left out of the text but its links are kept for contact-page discovery.
+    """
+    # Script/style blocks are cut out before parsing so the parser never
+    # builds nodes for them; a space keeps the text on either side apart.
+    html_content = _SCRIPT_BLOCKS.sub(' ', html_content)
 
-    standard_pattern = r'\b[a-zA-Z0-9][a-zA-Z0-9._%+-]*@[a-zA-Z0-9][a-zA-Z0-9.-]*\.[a-zA-Z]{2,}\b'
-    found_emails.update(re.findall(standard_pattern, text_content, re.IGNORECASE))
+    if lxml:
+        html_content = _END_TAG.sub(r'\1 ', html_content)
+        try:
+            root = lxml.html.document_fromstring(html_content.encode('utf-8', 'replace'), parser=_LXML_PARSER)
+        except Exception:
+            return [], ''
+        noscripts = list(root.iter('noscript'))
+        hidden = {a for noscript in noscripts for a in noscript.iter('a')}
+        footer = {a for element in root.xpath(_FOOTER_XPATH) for a in element.iter('a')}
+        anchors = [(a.get('href'), a.text_content(), a in hidden, a in footer) for a in root.iter('a') if a.get('href') is not None]
+        for noscript in noscripts:
+            # Emptied rather than removed so its tail stays a separate text node.
+            noscript.clear(keep_tail=True)
+        return anchors, ' '.join(root.itertext())
 
-    dot_pattern = r'\b([a-zA-Z0-9][a-zA-Z0-9._%+-]*)\s*@\s*([a-zA-Z0-9][a-zA-Z0-9.-]*)\s*\.\s*([a-zA-Z]{2,})\b'
-    dot_matches = re.findall(dot_pattern, html_content, re.IGNORECASE)
-    for match in dot_matches:
-        full_email = f"{match[0]}@{match[1]}.{match[2]}"
-        found_emails.add(full_email)
+    soup = BeautifulSoup(html_content, 'html.parser')
+    anchors = [(a['href'], a.get_text(), a.find_parent('noscript') is not None, a.find_parent(_is_footer) is not None)
+               for a in soup.find_all('a', href=True)]
+    for noscript in soup('noscript'):
+        noscript.decompose()
+    return anchors, soup.get_text(separator=' ')
 
-    at_pattern = r'\b([a-zA-Z0-9][a-zA-Z0-9._%+-]*)\s*\[\s*at\s*\]\s*([a-zA-Z0-9][a-zA-Z0-9.-]*)\s*\.\s*([a-zA-Z]{2,})\b'
-    at_matches = re.findall(at_pattern, html_content, re.IGNORECASE)
-    for match in at_matches:
-        full_email = f"{match[0]}@{match[1]}.{match[2]}"
-        found_emails.add(full_email)
+def _is_footer(tag):
+    return tag.name == 'footer' or 'footer' in f"{tag.get('id') or ''} {' '.join(tag.get('class') or [])}"
 
-    clean_emails = []
-    junk_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.css', '.js', '.svg', '.webp', '.mp4', '.woff', '.woff2', '.ttf', '.eot', '.ico']
-    junk_patterns = ['sentry', 'example.com', 'domain.com', 'email.com', 'your-email', 'youremail', 'test@', '@test', 'noreply@example']
+def extract_emails_from_html(html_content):
+    anchors, text_content = parse_page(html_content)
+    return emails_from_parsed_page(html_content, anchors, text_content)
 
-    for email in found_emails:
-        email = email.lower().strip()
-        email = re.sub(r'^[.\-_]+|[.\-_]+$', '', email)
-        email = email.rstrip('.,;:')
+def emails_from_parsed_page(html_content, anchors, text_content):
+    found_emails = set()
 
-        if '@' not in email or email.count('@') > 1:
+    for href, _, in_noscript, _ in anchors:
+        if in_noscript or not href.lower().startswith('mailto:'):
             continue
+        email = unquote(href.split(':')[1].split('?')[0]).strip()
+        if email and '@' in email:
+            found_emails.add(email)
+
+    found_emails.update(_find_emails_near_anchors(_STANDARD_EMAIL, text_content))
+
+    # Spaced-out and "[at]" obfuscations are matched on the raw HTML.
+    obfuscated = (_find_emails_near_anchors(_SPACED_EMAIL, html_content)
+                  + _find_emails_near_anchors(_BRACKETED_EMAIL, html_content, _BRACKETED_AT_ANCHOR))
+    for local, domain, tld in obfuscated:
+        found_emails.add(f"{local}@{domain}.{tld}")
+
+    clean_emails = set()
+    for email in found_emails:
+        email = email.lower().strip().strip('.-_').rstrip('.,;:')
 
-        if any(email.endswith(ext) for ext in junk_extensions):
+        if email.count('@') != 1:
             continue
 
-        if any(junk in email for junk in junk_patterns):
+        local, domain = email.split('@')
+        if not local or '.' not in domain:
             continue
 
-        if len(email) < 6 or len(email) > 254:
+        if domain.rsplit('.', 1)[1] in JUNK_EXTENSIONS:
             continue
 
-        parts = email.split('@')
-        if len(parts) != 2 or not parts[0] or not parts[1]:
+        if _JUNK_EMAIL.search(email):
             continue
 
-        if '.' not in parts[1]:
+        if len(email) < 6 or len(email) > 254:
             continue
 
-        clean_emails.append(email)
+        clean_emails.add(email)
 
-    return list(set(clean_emails))
+    return sorted(clean_emails)
+
+WEBSITE_BUTTON_XPATHS = [
+    "//a[@aria-label='Website']",
+    "//a[.//div[text()='Website']]",
+    "//a[.//span[text()='Website']]",
+    "//div[@role='heading']//following::a[contains(@href, 'http')][text()='Website']",
+    "//a[contains(@class, 'ab_button')]"
+]
 
 def get_google_website_button(driver):
     try:
-        xpaths = [
-            "//a[@aria-label='Website']",
-            "//a[.//div[text()='Website']]",
-            "//a[.//span[text()='Website']]",
-            "//div[@role='heading']//following::a[contains(@href, 'http')][text()='Website']",
-            "//a[contains(@class, 'ab_button')]"
-        ]
-        for xpath in xpaths:
+        for xpath in WEBSITE_BUTTON_XPATHS:
             buttons = driver.find_elements(By.XPATH, xpath)
             for btn in buttons:
                 href = btn.get_attribute('href')
@@ -139,6 +416,49 @@ def get_google_website_button(driver):
         return None
     except: return None
 
+def read_search_results(driver):
+    """Reads a results page from one page_source snapshot instead of an
+    element-by-element WebDriver walk.
+
+    Returns (website_button_href, [(href, text), ...]) with hrefs made
+    absolute, the same things get_google_website_button and the result
+    links would have given.
+    """
+    if lxml is None:
+        return _read_search_results_webdriver(driver)
+    try:
+        tree = lxml.html.document_fromstring(page_html(driver).encode('utf-8'), parser=_LXML_PARSER)
+        base_url = driver.current_url
+    except Exception:
+        return None, []
+
+    button = None
+    for xpath in WEBSITE_BUTTON_XPATHS:
+        for element in tree.xpath(xpath):
+            href = urljoin(base_url, element.get('href') or '')
+            if element.get('href') and "http" in href and "google" not in href:
+                button = href
+                break
+        if button:
+            break
+
+    containers = tree.xpath("//*[@id='search']")
+    anchors = containers[0].iter('a') if containers else tree.xpath("//div[@class='g']//a")
+    links = [
+        (urljoin(base_url, anchor.get('href')), ' '.join(anchor.text_content().split()))
+        for anchor in anchors if anchor.get('href')
+    ]
+    return button, links
+
+def _read_search_results_webdriver(driver):
+    official_site = get_google_website_button(driver)
+    try:
+        results_container = driver.find_element(By.ID, "search")
+        elements = results_container.find_elements(By.TAG_NAME, "a")
+    except:
+        elements = driver.find_elements(By.XPATH, "//div[@class='g']//a")
+    return official_site, [(element.get_attribute('href'), element.text) for element in elements]
+
 def normalize_name(name):
     """Cleans company name for matching logic."""
     if not isinstance(name, str): return []
@@ -148,126 +468,161 @@ def normalize_name(name):
     return [t for t in tokens if t not in remove_words and len(t) > 2]
 
 def search_company_url(driver, company_name, location="London UK", log_callback=None):
-    try:
-        driver.get(SEARCH_ENGINE)
-        handle_google_consent(driver)
-
-        if "unusual traffic" in driver.page_source.lower():
-            print("   -> [ALERT] CAPTCHA detected! This may cause failures in automated mode.")
-            if log_callback:
-                log_callback("CAPTCHA detected - request may fail")
-
-        try:
-            search_box = driver.find_element(By.NAME, "q")
-            search_box.clear()
-            search_box.send_keys(f"{company_name} {location}")
-            search_box.send_keys(Keys.RETURN)
-        except:
-            driver.refresh()
-            time.sleep(3)
-            search_box = driver.find_element(By.NAME, "q")
-            search_box.send_keys(f"{company_name} {location}")
-            search_box.send_keys(Keys.RETURN)
-
-        random_sleep(4, 6)
-        handle_google_consent(driver)
-
-        official_site = get_google_website_button(driver)
-        if official_site:
-            print(f"   -> [METHOD: BUTTON] Found official link: {official_site}")
-            return official_site
-
-        try:
-            results_container = driver.find_element(By.ID, "search")
-            links = results_container.find_elements(By.TAG_NAME, "a")
-        except:
-            links = driver.find_elements(By.XPATH, "//div[@class='g']//a")
-
-        ignored_domains = [
-            'google.', 'microsoft.', 'yahoo.', 'bing.', 'facebook.', 'linkedin.', 'instagram.', 'twitter.',
-            'youtube.', 'pinterest.', 'yell.com', 'checkatrade.com', 'trustpilot.com', 'thomsonlocal',
-            'company-information.service.gov.uk', 'companieshouse.gov.uk',
-            'thegazette.co.uk', 'endole.co.uk', 'pomanda.com', 'bizify.co.uk', '192.com',
-            'wikipedia.org', 'wiki', '.gov.qa', 'gov.qa', 'moci.gov.qa', 'portal.www.gov.qa',
-            'hukoomi.gov.qa', 'gsdp.gov.qa', 'yellowpages', 'whitepages', 'yelp.com',
-            'bbb.org', 'dnb.com', 'bloomberg.com', 'reuters.com', 'crunchbase.com',
-            'zoominfo.com', 'kompass.com', 'europages.', 'alibaba.com', 'indiamart.com',
-            'justdial.com', 'sulekha.com', 'foursquare.com', 'manta.com', 'bizapedia.com',
-            'corporationwiki.com', 'spoke.com', 'vault.com', 'glassdoor.com', 'indeed.com',
-            'naviqatar.com', 'waze.com', 'wanderlog.com'
-        ]
-
-        valid_links = []
-        for link in links:
-            href = link.get_attribute('href')
-            if not href or 'http' not in href or "google.com" in href: continue
-            if any(ignored in href for ignored in ignored_domains): continue
-            valid_links.append((href, link.text.lower()))
+    return find_company_url(driver, company_name, location, log_callback)[0]
+
+def find_company_url(driver, company_name, location="London UK", log_callback=None, timings=None):
+    """Searches for the company's website. Returns (url, method), url is None
+    if nothing matched; raises if the search could not run."""
+    timings = timings or RowTimings()
+    with timings.stage("search"):
+        return _find_company_url(driver, company_name, location, log_callback, timings)
+
+class BrowserSearchProvider(SearchProvider):
+    """The original search: types the query into SEARCH_ENGINE in the browser."""
+
+    name = 'browser'
+
+    def find(self, company_name, name_tokens, location, driver=None, log_callback=None, timings=None):
+        return _find_company_url(driver, company_name, location, log_callback, timings or RowTimings())
+
+def company_identity(company):
+    """Who a row is, for grouping rows and keying cached results: the name
+    lowercased, without punctuation or trailing legal suffixes.
+
+    Unlike normalize_name (which is for matching search results) no other
+    word is dropped, so "JB Electrical Ltd" and "MK Electrical Ltd" stay
+    apart while "Acme Ltd" and "ACME Limited" meet.
+    """
+    tokens = re.sub(r'[^\w\s]', '', str(company).lower()).split()
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+def build_search_chain(names=None, fetcher=None, city=None):
+    """Builds the provider chain for a job from provider names, in order.
+
+    Providers that cannot run (no known_domains.csv, no HTTP fetcher, no
+    city to check guessed sites against) are left out; the browser search
+    is always available.
+    """
+    factories = {
+        'local': lambda: LocalLookupProvider(company_identity),
+        'domain_guess': lambda: DomainGuessProvider(fetcher, city, _blocked_domains),
+        'browser': BrowserSearchProvider,
+    }
+    names = list(names or DEFAULT_PROVIDERS)
+    unknown = [name for name in names if name not in factories]
+    if unknown:
+        raise ValueError(f"Unknown search provider(s): {', '.join(unknown)}")
+    return ProviderChain([factories[name]() for name in names])
+
+def _check_captcha(driver, log_callback):
+    html = page_html(driver).lower()
+    if "unusual traffic" in html or 'id="captcha-form"' in html:
+        print("   -> [ALERT] CAPTCHA detected! This may cause failures in automated mode.")
+        if log_callback:
+            log_callback("CAPTCHA detected - request may fail")
+        raise SearchError("the search engine answered with a CAPTCHA")
 
-        company_tokens = normalize_name(company_name)
-        for href, text in valid_links:
-            if any(token in text for token in company_tokens):
-                print(f"   -> [METHOD: TITLE MATCH] Found link: {href}")
-                return href
+def _find_company_url(driver, company_name, location, log_callback, timings):
+    """Searches SEARCH_ENGINE in the browser. Returns (url, method), or
+    (None, None) when the results hold no usable link; a search that cannot
+    run (CAPTCHA, page-load timeout, dead browser) raises instead."""
+    _politeness.wait_turn(SEARCH_ENGINE, SEARCH_INTERVAL, timings)
+    driver.get(SEARCH_ENGINE)
+    handle_google_consent(driver)
 
-        if valid_links:
-            print(f"   -> [METHOD: FALLBACK] Picking first valid result: {valid_links[0][0]}")
-            return valid_links[0][0]
+    _check_captcha(driver, log_callback)
 
-        print(f"   -> No valid website found for {company_name}")
-        return None
-    except Exception as e:
-        print(f"   -> Error searching for {company_name}: {e}")
-        return None
-
-def find_contact_and_about_pages(driver, base_url):
     try:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        pages = {
-            'contact-us': None,
-            'contact': None,
-            'about-us': None,
-            'about': None,
-            'reach-us': None,
-            'get-in-touch': None
-        }
-
-        for link in soup.find_all('a', href=True):
-            href = link.get('href', '')
-            text = link.get_text().lower().strip()
-            full_url = urljoin(base_url, href)
-
-            if full_url.startswith(base_url) or href.startswith('/'):
-                href_lower = href.lower()
-
-                if ('contact-us' in href_lower or 'contactus' in href_lower or
-                    'contact_us' in href_lower or text == 'contact us'):
-                    if not pages['contact-us']:
-                        pages['contact-us'] = full_url
-
-                elif ('contact' in href_lower or text == 'contact' or
-                      'get-in-touch' in href_lower or 'reach-us' in href_lower):
-                    if not pages['contact'] and not pages['contact-us']:
-                        pages['contact'] = full_url
-
-                elif ('about-us' in href_lower or 'aboutus' in href_lower or
-                      'about_us' in href_lower or text == 'about us'):
-                    if not pages['about-us']:
-                        pages['about-us'] = full_url
-
-                elif 'about' in href_lower or text == 'about':
-                    if not pages['about'] and not pages['about-us']:
-                        pages['about'] = full_url
-
-        result = []
-        priority_order = ['contact-us', 'contact', 'about-us', 'about']
-        for key in priority_order:
-            if pages[key]:
-                result.append(pages[key])
-
-        return result if result else []
+        search_box = driver.find_element(By.NAME, "q")
+        search_box.clear()
+        search_box.send_keys(f"{company_name} {location}")
+        search_box.send_keys(Keys.RETURN)
     except:
-        return []
+        driver.refresh()
+        wait_until_ready(driver, ['[name="q"]'], WAIT_CEILINGS["search"], timings)
+        search_box = driver.find_element(By.NAME, "q")
+        search_box.send_keys(f"{company_name} {location}")
+        search_box.send_keys(Keys.RETURN)
+
+    wait_until_ready(driver, SEARCH_READY_SELECTORS, WAIT_CEILINGS["search"], timings)
+    handle_google_consent(driver)
+    _check_captcha(driver, log_callback)
+
+    official_site, links = read_search_results(driver)
+    if official_site:
+        print(f"   -> [METHOD: BUTTON] Found official link: {official_site}")
+        return official_site, "button"
+
+    candidates = candidate_links(links, _blocked_domains)
+    ranked = rank_candidates(candidates, normalize_name(company_name))
+    if ranked and ranked[0][1] > 0:
+        print(f"   -> [METHOD: TITLE MATCH] Found link: {ranked[0][0]}")
+        return ranked[0][0], "title_match"
+
+    if ranked:
+        print(f"   -> [METHOD: FALLBACK] Picking first valid result: {ranked[0][0]}")
+        return ranked[0][0], "fallback"
+
+    print(f"   -> No valid website found for {company_name}")
+    return None, None
+
+def analyze_page(html_content, base_url):
+    """Parses a page once and returns (emails, anchors); the anchors feed
+    contact-page discovery when the page has no emails."""
+    anchors, text_content = parse_page(html_content)
+    emails = emails_from_parsed_page(html_content, anchors, text_content)
+    return emails, anchors
+
+def company_cache_key(company, location):
+    return ResultCache.make_key(company_identity(company), location)
+
+def company_group_key(company, location):
+    return f"{company_identity(company)}|{' '.join(location.lower().split())}"
+
+def group_companies(input_file, location, enrich_mode=DEFAULT_ENRICH_MODE):
+    """Groups the sheet's rows by company_group_key, so repeated rows for
+    one company and variants like "Ltd" vs "Limited" are searched once.
+
+    Rows that enrich_mode leaves alone are not grouped. Outside 'full' mode
+    a row that already has a website only has its email looked for, on that
+    website, so its group key also carries the website; and only the
+    columns a row is missing are filled in.
+
+    Returns (groups, known_websites, partial_rows, skipped): {group_key:
+    [row indices]} with rows in file order, {group_key: website} for groups
+    whose email is to be looked for on the sheet's website, {row index:
+    'website' or 'email'} for rows where only that column is to be written,
+    and the number of rows skipped.
+    """
+    groups = {}
+    known_websites = {}
+    partial_rows = {}
+    skipped = 0
+    for index, company, website, email in iter_company_results(input_file):
+        has_website, has_email = has_valid_data(website), has_valid_data(email)
+        if enrich_mode != 'full' and has_email and (enrich_mode == 'missing_email' or has_website):
+            skipped += 1
+            continue
+        key = company_group_key(company, location)
+        if enrich_mode != 'full' and has_website:
+            website = str(website).strip()
+            if not website.startswith(('http://', 'https://')):
+                website = f"https://{website}"
+            key = f"{key}|{website.lower().rstrip('/')}"
+            known_websites.setdefault(key, website)
+            partial_rows[index] = 'email'
+        elif enrich_mode != 'full' and has_email:
+            partial_rows[index] = 'website'
+        groups.setdefault(key, []).append(index)
+    return groups, known_websites, partial_rows, skipped
+
+def missing_columns_only(results, partial_rows):
+    """results ({row index: {"website", "email"}}) narrowed, for the rows in
+    partial_rows, to the one column each is missing."""
+    return {index: {partial_rows[index]: values.get(partial_rows[index])} if index in partial_rows else values
+            for index, values in results.items()}
 
 def has_valid_data(value):
     """Check if a cell has valid data (not empty, not 'Not Found', not 'Error')"""
@@ -278,191 +633,630 @@ def has_valid_data(value):
         return False
     return True
 
-def process_workflow(input_file=None, city=None, country=None, log_callback=None, stop_check=None):
+def fetch_site_emails_http(fetcher, site_url, timings=None):
+    """Scans a site's homepage and contact/about pages over plain HTTP.
+
+    Returns the emails found (possibly empty), or None when the site looks
+    JS-rendered or unreachable and has to be loaded in the browser instead.
+    """
+    timings = timings or RowTimings()
+    with timings.stage("http_fetch"):
+        html = fetcher.fetch(site_url)
+    if html is None or looks_js_rendered(html):
+        return None
+
+    with timings.stage("parse"):
+        emails, anchors = analyze_page(html, site_url)
+    if emails:
+        print(f"   -> [HTTP] Found {len(emails)} email(s) on homepage")
+        return emails
+
+    with timings.stage("contact_crawl"):
+        contact_pages = discover_contact_pages(anchors, site_url, fetcher)
+        guessed = guessed_urls(anchors, site_url)
+
+    # All candidates are requested at once (the fetcher caps requests per
+    # host) but read in priority order, so the best page with emails wins
+    # and whatever is still in flight is cancelled.
+    with timings.stage("contact_crawl"):
+        pending = [(page_url, fetcher.submit(page_url)) for page_url in contact_pages]
+        try:
+            for page_url, future in pending:
+                print(f"   -> [HTTP] Checking: {page_url}")
+                with timings.stage("http_fetch"):
+                    page_html = future.result()
+                if page_html is None:
+                    continue
+                if looks_js_rendered(page_html):
+                    # A thin page at a guessed path is usually a soft 404,
+                    # not a sign the site needs JavaScript.
+                    if page_url.rstrip('/') in guessed:
+                        continue
+                    return None
+                with timings.stage("parse"):
+                    emails = extract_emails_from_html(page_html)
+                if emails:
+                    print(f"   -> [HTTP] Found {len(emails)} email(s) on this page")
+                    return emails
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    return []
+
+def scrape_site_emails(driver, site_url, fetcher=None, timings=None):
+    """Finds emails on a site's homepage, then its contact/about pages.
+
+    Static sites are handled by the HTTP fetcher; the browser is only used
+    when the fetcher is disabled or the site needs JavaScript to render.
+    Returns (emails, source) where source is "http" or "browser".
+    """
+    timings = timings or RowTimings()
+    if fetcher:
+        emails = fetch_site_emails_http(fetcher, site_url, timings)
+        if emails is not None:
+            return emails, "http"
+        print("   -> Site needs a browser, loading it in Chrome...")
+
+    _politeness.wait_turn(site_url, SITE_PAGE_INTERVAL, timings)
+    with timings.stage("page_load"):
+        try: driver.get(site_url)
+        except TimeoutException: driver.execute_script("window.stop();")
+        except:
+            time.sleep(2)
+            driver.refresh()
+
+    wait_until_ready(driver, ceiling=WAIT_CEILINGS["page"], timings=timings)
+    print("   -> Searching for emails on homepage...")
+    with timings.stage("parse"):
+        emails, anchors = analyze_page(page_html(driver), site_url)
+
+    if emails:
+        print(f"   -> Found {len(emails)} email(s) on homepage")
+        return emails, "browser"
+
+    print("   -> No emails on homepage, checking contact/about pages...")
+    with timings.stage("contact_crawl"):
+        contact_pages = discover_contact_pages(anchors, site_url, fetcher)
+
+    if not contact_pages:
+        print("   -> No contact/about pages found")
+        return [], "browser"
+
+    print(f"   -> Found {len(contact_pages)} potential page(s) to check")
+    with timings.stage("contact_crawl"):
+        emails = scan_pages_in_tabs(driver, contact_pages, timings)
+    return emails, "browser"
+
+def scan_pages_in_tabs(driver, page_urls, timings=None):
+    """Loads pages CONTACT_PAGE_TABS at a time in background tabs and reads
+    them in the given (priority) order; the first with emails wins and the
+    loads left unread are stopped. Falls back to the main tab if a tab
+    cannot be opened. Tabs are started SITE_PAGE_INTERVAL apart, like any
+    other site request.
+
+    On a LazyDriver the tabs are kept (driver.tabs) and navigated again for
+    the next batch and row rather than opened and closed each time.
+    """
+    timings = timings or RowTimings()
+    main_handle = driver.current_window_handle
+    kept = isinstance(driver, LazyDriver)
+    tabs = driver.tabs if kept else []
+    live = set(driver.window_handles)
+    tabs[:] = [handle for handle in tabs if handle in live and handle != main_handle]
+    loading = []
+    try:
+        for start in range(0, len(page_urls), CONTACT_PAGE_TABS):
+            batch = page_urls[start:start + CONTACT_PAGE_TABS]
+
+            loading = []
+            for position, page_url in enumerate(batch):
+                # Each tab is a request to the site, so each takes its own
+                # politeness slot; the loads are staggered, not simultaneous.
+                _politeness.wait_turn(page_url, SITE_PAGE_INTERVAL, timings)
+                with timings.stage("page_load"):
+                    handle, previous_url = _navigate_tab(driver, tabs, position, page_url)
+                loading.append((page_url, handle, previous_url))
+
+            while loading:
+                page_url, handle, previous_url = loading.pop(0)
+                try:
+                    print(f"   -> Checking: {page_url}")
+                    if handle:
+                        driver.switch_to.window(handle)
+                        _wait_for_navigation(driver, previous_url, page_url)
+                    else:
+                        driver.switch_to.window(main_handle)
+                        with timings.stage("page_load"):
+                            driver.get(page_url)
+                    wait_until_ready(driver, ceiling=WAIT_CEILINGS["contact_page"], timings=timings)
+                    with timings.stage("parse"):
+                        emails = extract_emails_from_html(page_html(driver))
+                    if emails:
+                        print(f"   -> Found {len(emails)} email(s) on this page")
+                        return emails
+                except Exception as e:
+                    print(f"   -> Error loading page: {e}")
+                    continue
+    finally:
+        _stop_loading(driver, [handle for _, handle, _ in loading if handle])
+        if kept:
+            try:
+                driver.switch_to.window(main_handle)
+            except Exception:
+                pass
+        else:
+            _close_other_tabs(driver, main_handle)
+    return []
+
+def _navigate_tab(driver, tabs, position, page_url):
+    """Starts loading page_url in the position-th tab, opening tabs as
+    needed, without waiting for it. Returns (handle, URL the tab showed
+    before), or (None, None) if no tab could be used."""
+    try:
+        while len(tabs) <= position:
+            before = set(driver.window_handles)
+            driver.execute_script("window.open('about:blank', '_blank');")
+            opened = [handle for handle in driver.window_handles if handle not in before]
+            if not opened:
+                return None, None
+            tabs.append(opened[0])
+        handle = tabs[position]
+        driver.switch_to.window(handle)
+        previous_url = driver.current_url
+        driver.execute_script("window.location.href = arguments[0];", page_url)
+        return handle, previous_url
+    except Exception:
+        return None, None
+
+def _wait_for_navigation(driver, previous_url, page_url):
+    """Waits until a reused tab has left the page it showed before, so the
+    last site's page is never read as the new one."""
+    if previous_url == page_url:
+        return
+    deadline = time.monotonic() + WAIT_CEILINGS["contact_page"]
+    while driver.current_url == previous_url and time.monotonic() < deadline:
+        time.sleep(TAB_POLL_INTERVAL)
+
+def _stop_loading(driver, handles):
+    for handle in handles:
+        try:
+            driver.switch_to.window(handle)
+            driver.execute_script("window.stop();")
+        except Exception:
+            pass
+
+def _close_other_tabs(driver, main_handle):
+    try:
+        for handle in driver.window_handles:
+            if handle != main_handle:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.switch_to.window(main_handle)
+    except:
+        pass
+
+def process_company(driver, company, location, log_callback=None, fetcher=None, timings=None, search=None, website=None):
+    """Finds the website and email for one company.
+
+    Returns (website, email, method), where method records how the website
+    was found and how its page was read, e.g. "button+http". Time spent in
+    each stage is added to timings when given. search is the ProviderChain
+    used to find the website; the browser search alone when not given.
+    A website already known is used as is, without searching ("known").
+    Raises SearchError when the website search could not run.
+    """
+    timings = timings or RowTimings()
+    search = search or ProviderChain([BrowserSearchProvider()])
+    name_tokens = normalize_name(company)
+    if website:
+        print(f"   -> [METHOD: KNOWN] Using website from the sheet: {website}")
+        website_url, search_method, provider = website, "known", None
+    else:
+        with timings.stage("search"):
+            website_url, search_method, provider = search.find(company, name_tokens, location, driver, log_callback, timings)
+    if not website_url:
+        print("   -> Could not find website.")
+        print("   -> Cannot search for email without a website")
+        return "Not Found", "Not Found", "none"
+
+    print(f"   -> Found Website: {website_url}")
+    website = website_url
+    method = search_method
+
+    try:
+        emails, source = scrape_site_emails(driver, website_url, fetcher, timings)
+        method = f"{search_method}+{source}"
+
+        if not emails and provider:
+            print("   -> No emails found on existing website, searching for alternative website...")
+            with timings.stage("alt_site_retry"):
+                try:
+                    with timings.stage("search"):
+                        new_website_url, new_search_method, _ = search.find(
+                            company, name_tokens, location, driver, log_callback, timings, after=provider
+                        )
+                except SearchError as e:
+                    # "Not Found" would be cached; the alternative was never searched.
+                    print(f"   -> Alternative website search failed: {e}")
+                    return website, "Error", method
+
+                if new_website_url and new_website_url != website_url:
+                    print(f"   -> Found alternative website: {new_website_url}")
+                    try:
+                        emails, source = scrape_site_emails(driver, new_website_url, fetcher, timings)
+                        if emails:
+                            website = new_website_url
+                            method = f"alternate_{new_search_method}+{source}"
+                            print(f"   -> Updated website to: {new_website_url}")
+                    except Exception as e:
+                        print(f"   -> Error visiting alternative website: {e}")
+                else:
+                    print("   -> No alternative website found or same as existing")
+
+        email_string = ", ".join(emails) if emails else "Not Found"
+        print(f"   -> Final result: {email_string}")
+        return website, email_string, method
+    except Exception as e:
+        print(f"   -> Error visiting website: {e}")
+        return website, "Error", method
+
+def process_workflow(input_file=None, city=None, country=None, log_callback=None, stop_check=None, pool_size=DEFAULT_POOL_SIZE, http_fast_path=USE_HTTP_FAST_PATH,
+                     use_cache=True, force_refresh=False, cache_ttl_days=RESULT_CACHE_TTL_DAYS, resume=True,
+                     output_file=None, progress_callback=None, metrics=None, timings_file=None, search_providers=None,
+                     enrich_mode=DEFAULT_ENRICH_MODE):
+    """Finds websites and emails for the companies in the input sheet.
+
+    enrich_mode (one of ENRICH_MODES) picks the rows: every row, only rows
+    missing a website or email, or only rows missing an email, whose
+    existing website is then scanned without searching.
+
+    Websites are looked up by search_providers in order (names from
+    providers.DEFAULT_PROVIDERS by default). Stage timings are collected
+    into metrics (a StageHistograms, created if not given) and, when
+    timings_file is set, appended there as one JSON line per row.
+
+    Fatal errors are logged, the rows finished so far are written out, and
+    the error is raised again.
+    """
     if not city or not country:
         raise ValueError("City and Country are required parameters")
+    if enrich_mode not in ENRICH_MODES:
+        raise ValueError(f"Unknown enrichment mode {enrich_mode!r}; choose from {', '.join(ENRICH_MODES)}")
 
     city = city.strip()
     country = country.strip()
     location = f"{city} {country}"
-
-    msg = f"Starting Browser for location: {location}..."
-    print(msg)
-    if log_callback:
-        log_callback(msg)
-
-    driver = init_driver()
+    pool_size = max(1, min(int(pool_size or DEFAULT_POOL_SIZE), MAX_POOL_SIZE))
+    output_file = output_file or OUTPUT_FILE
+    file_to_process = input_file or INPUT_FILE
+    checkpoint = None
+    timings_log = None
+    page_cache = fetcher = result_cache = None
+    metrics = metrics if metrics is not None else StageHistograms()
 
     try:
-        file_to_process = input_file or INPUT_FILE
         print(f"Reading file: {file_to_process}")
 
-        if file_to_process.endswith('.csv'): df = pd.read_csv(file_to_process)
-        else: df = pd.read_excel(file_to_process)
-
-        print(f"Loaded {len(df)} companies.")
-
-        if 'Website' not in df.columns: df['Website'] = ""
-        if 'Email' not in df.columns: df['Email'] = ""
+        # The sheet is streamed: one pass over the Name column to group
+        # duplicate companies, one more to feed the browsers, and the output
+        # is copied row by row from the input at the end, so the rows are
+        # never all in memory.
+        groups, known_websites, partial_rows, skipped_rows = group_companies(file_to_process, location, enrich_mode)
+        first_rows = {rows[0]: key for key, rows in groups.items()}
+        total_companies = sum(len(rows) for rows in groups.values())
+        duplicate_rows = total_companies - len(groups)
+        dedup_ratio = duplicate_rows / total_companies if total_companies else 0.0
+        print(f"Loaded {total_companies + skipped_rows} companies.")
+        if duplicate_rows:
+            msg = f"Found {len(groups)} unique companies: {duplicate_rows} duplicate row(s) will reuse their result ({dedup_ratio:.0%})"
+            print(msg)
+            if log_callback:
+                log_callback(msg)
 
-        msg = "Processing all companies with fresh search..."
+        msg = f"Enrichment mode: {ENRICH_MODES[enrich_mode]}"
+        if enrich_mode != 'full':
+            msg += f" - skipping {skipped_rows} row(s) that already have {'an email' if enrich_mode == 'missing_email' else 'a website and email'}"
+            if known_websites:
+                msg += f", reusing the website of {len(known_websites)} compan{'y' if len(known_websites) == 1 else 'ies'}"
         print(msg)
         if log_callback:
             log_callback(msg)
 
+        checkpoint = Checkpoint(checkpoint_path(output_file), input_fingerprint(file_to_process, location), resume=resume)
+        if checkpoint.completed:
+            msg = f"Resuming from checkpoint: {len(checkpoint.completed)} companies already processed"
+            print(msg)
+            if log_callback:
+                log_callback(msg)
+
+        # A crash can leave a group half fanned out; finish it from the
+        # checkpoint. Groups with no finished row are searched again.
         companies_to_process = 0
-        for idx, row in df.iterrows():
-            if pd.isna(row['Name']) or str(row['Name']).strip() == "":
+        for rows in groups.values():
+            finished = [index for index in rows if index in checkpoint.completed]
+            if not finished:
+                companies_to_process += 1
                 continue
-            companies_to_process += 1
-
+            for index in rows:
+                if index not in checkpoint.completed:
+                    checkpoint.record(index, **checkpoint.completed[finished[0]])
         msg = f"Total companies to process: {companies_to_process}"
         print(msg)
         if log_callback:
             log_callback(msg)
+        if progress_callback:
+            progress_callback(len(checkpoint.completed), total_companies)
 
+        pool_size = min(pool_size, max(companies_to_process, 1))
+        msg = f"Using up to {pool_size} browser(s) for location: {location}..."
+        print(msg)
+        if log_callback:
+            log_callback(msg)
+
+        # Pages are shared across companies and jobs; a forced refresh still
+        # reuses them, but only after the server confirms they are unchanged.
+        page_cache = PageCache(fresh_hours=0 if force_refresh else PAGE_CACHE_FRESH_HOURS) if use_cache and http_fast_path else None
+        fetcher = HttpFetcher(page_cache=page_cache) if http_fast_path else None
+        search_chain = build_search_chain(search_providers, fetcher, city)
+        msg = f"Search providers: {', '.join(search_chain.names)}"
+        print(msg)
+        if log_callback:
+            log_callback(msg)
+        result_cache = ResultCache(ttl_days=cache_ttl_days) if use_cache else None
+        if force_refresh:
+            msg = "Force refresh enabled: ignoring cached results"
+            print(msg)
+            if log_callback:
+                log_callback(msg)
+        if timings_file:
+            timings_log = open(timings_file, 'a', encoding='utf-8')
+        results_lock = threading.Lock()
+        stopped = threading.Event()
+        feeding_done = threading.Event()
+        work_queue = queue.Queue(maxsize=pool_size * WORK_QUEUE_DEPTH)
         processed_count = 0
-        for index, row in df.iterrows():
-            if stop_check and stop_check():
-                msg = "Stop signal received. Saving progress..."
+        cache_hits = 0
+        browser_restarts = 0
+        fatal_errors = []
+
+        def feeder():
+            try:
+                for index, company in iter_companies(file_to_process):
+                    group_key = first_rows.get(index)
+                    if group_key is None or index in checkpoint.completed:
+                        continue
+                    while not stopped.is_set():
+                        try:
+                            work_queue.put((index, company, group_key), timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    if stopped.is_set():
+                        break
+            except Exception as e:
+                msg = f"Error reading {file_to_process}: {e}"
                 print(msg)
                 if log_callback:
                     log_callback(msg)
-                break
-
-            company = row['Name']
-            if pd.isna(company) or str(company).strip() == "": continue
-
-            processed_count += 1
-
-            msg = f"[{processed_count}/{companies_to_process}] Processing {company} - searching for website and email"
+            finally:
+                feeding_done.set()
+
+        def restart_browser(driver, worker_id, reason):
+            nonlocal browser_restarts
+            start = time.perf_counter()
+            driver.restart()
+            metrics.observe("driver_restart", time.perf_counter() - start)
+            with results_lock:
+                browser_restarts += 1
+            msg = f"   -> Restarting browser {worker_id}: {reason}"
             print(msg)
             if log_callback:
                 log_callback(msg)
 
-            website_url = search_company_url(driver, company, location, log_callback)
-            if not website_url:
-                print("   -> Could not find website.")
-                df.at[index, 'Website'] = "Not Found"
-                df.at[index, 'Email'] = "Not Found"
-                website_url = None
-            else:
-                print(f"   -> Found Website: {website_url}")
-                df.at[index, 'Website'] = website_url
-
-            if website_url:
-                try:
-                    try: driver.get(website_url)
-                    except TimeoutException: driver.execute_script("window.stop();")
-                    except:
-                        time.sleep(2)
-                        driver.refresh()
-
-                    random_sleep(2, 4)
-                    print("   -> Searching for emails on homepage...")
-                    emails = extract_emails_from_html(driver.page_source)
-
-                    if emails:
-                        print(f"   -> Found {len(emails)} email(s) on homepage")
+        def worker(worker_id):
+            nonlocal processed_count, cache_hits
+            driver = LazyDriver()
+            try:
+                while not stopped.is_set():
+                    if stop_check and stop_check():
+                        with results_lock:
+                            if not stopped.is_set():
+                                stopped.set()
+                                msg = "Stop signal received. Saving progress..."
+                                print(msg)
+                                if log_callback:
+                                    log_callback(msg)
+                        break
+
+                    try:
+                        index, company, group_key = work_queue.get(timeout=0.5)
+                    except queue.Empty:
+                        if feeding_done.is_set() and work_queue.empty():
+                            break
+                        continue
+
+                    with results_lock:
+                        processed_count += 1
+                        position = processed_count
+
+                    msg = f"[{position}/{companies_to_process}] Processing {company} - searching for website and email"
+                    print(msg)
+                    if log_callback:
+                        log_callback(msg)
+
+                    cache_key = company_cache_key(company, location)
+                    known_website = known_websites.get(group_key)
+                    # A cached result may be for another website than the sheet's.
+                    cached = result_cache.get(cache_key) if result_cache and not force_refresh and not known_website else None
+                    row_timings = RowTimings()
+
+                    if cached:
+                        website, email, method = cached["website"], cached["email"], cached["method"]
+                        msg = f"   -> [CACHE] Using stored result for {company} ({cached['method']})"
+                        print(msg)
+                        if log_callback:
+                            log_callback(msg)
                     else:
-                        print("   -> No emails on homepage, checking contact/about pages...")
-                        contact_pages = find_contact_and_about_pages(driver, website_url)
-
-                        if contact_pages:
-                            print(f"   -> Found {len(contact_pages)} potential page(s) to check")
-                            for page_url in contact_pages:
-                                if emails:
-                                    break
+                        reason = driver.recycle_reason()
+                        if reason:
+                            restart_browser(driver, worker_id, f"recycling after {reason}")
+                        # The browser starts on first use, so rows answered by the
+                        # cache or a non-browser provider never launch Chrome.
+                        driver.timings = row_timings
+                        for attempt in range(ROW_CRASH_RETRIES + 1):
+                            with row_timings.stage("row"):
                                 try:
-                                    print(f"   -> Checking: {page_url}")
-                                    driver.get(page_url)
-                                    random_sleep(2, 3)
-                                    emails = extract_emails_from_html(driver.page_source)
-                                    if emails:
-                                        print(f"   -> Found {len(emails)} email(s) on this page")
-                                        break
+                                    website, email, method = process_company(driver, company, location, log_callback, fetcher, row_timings, search_chain, known_website)
+                                except SearchError as e:
+                                    msg = f"   -> Search failed for {company}: {e}"
+                                    print(msg)
+                                    if log_callback:
+                                        log_callback(msg)
+                                    website, email, method = "Error", "Error", "none"
                                 except Exception as e:
-                                    print(f"   -> Error loading page: {e}")
-                                    continue
-                        else:
-                            print("   -> No contact/about pages found")
-
-                        if not emails:
-                            print("   -> No emails found on existing website, searching Google for alternative website...")
-                            new_website_url = search_company_url(driver, company, location, log_callback)
-
-                            if new_website_url and new_website_url != website_url:
-                                print(f"   -> Found alternative website: {new_website_url}")
-                                try:
-                                    driver.get(new_website_url)
-                                    random_sleep(2, 4)
-                                    print("   -> Searching for emails on alternative homepage...")
-                                    emails = extract_emails_from_html(driver.page_source)
-
-                                    if emails:
-                                        print(f"   -> Found {len(emails)} email(s) on alternative homepage")
-                                        df.at[index, 'Website'] = new_website_url
-                                        print(f"   -> Updated website to: {new_website_url}")
-                                    else:
-                                        print("   -> No emails on alternative homepage, checking its contact/about pages...")
-                                        contact_pages = find_contact_and_about_pages(driver, new_website_url)
-
-                                        if contact_pages:
-                                            print(f"   -> Found {len(contact_pages)} potential page(s) on alternative site")
-                                            for page_url in contact_pages:
-                                                if emails:
-                                                    break
-                                                try:
-                                                    print(f"   -> Checking: {page_url}")
-                                                    driver.get(page_url)
-                                                    random_sleep(2, 3)
-                                                    emails = extract_emails_from_html(driver.page_source)
-                                                    if emails:
-                                                        print(f"   -> Found {len(emails)} email(s) on this page")
-                                                        df.at[index, 'Website'] = new_website_url
-                                                        print(f"   -> Updated website to: {new_website_url}")
-                                                        break
-                                                except Exception as e:
-                                                    print(f"   -> Error loading page: {e}")
-                                                    continue
-                                except Exception as e:
-                                    print(f"   -> Error visiting alternative website: {e}")
+                                    # Only this row is lost; the worker carries on.
+                                    if driver.alive():
+                                        msg = f"   -> Error processing {company}: {e}"
+                                        print(msg)
+                                        if log_callback:
+                                            log_callback(msg)
+                                    website, email, method = "Error", "Error", "none"
+                            if driver.start_error or driver.alive():
+                                break
+                            # Whatever the row found while the browser was dying
+                            # is not trusted: run it again on a fresh browser.
+                            if attempt < ROW_CRASH_RETRIES:
+                                restart_browser(driver, worker_id, f"session lost, retrying {company}")
                             else:
-                                print("   -> No alternative website found or same as existing")
-
-                    email_string = ", ".join(emails) if emails else "Not Found"
-                    print(f"   -> Final result: {email_string}")
-                    df.at[index, 'Email'] = email_string
-                except Exception as e:
-                    print(f"   -> Error visiting website: {e}")
-                    df.at[index, 'Email'] = "Error"
-            else:
-                print("   -> Cannot search for email without a website")
-                df.at[index, 'Email'] = "Not Found"
+                                restart_browser(driver, worker_id, "session lost")
+                                email = "Error"
+                        if driver.start_error:
+                            # Every row would fail the same way: end the job
+                            # rather than fill the sheet with errors.
+                            with results_lock:
+                                fatal_errors.append(driver.start_error)
+                            stopped.set()
+                            break
+                        if result_cache and email != "Error" and website != "Error":
+                            result_cache.put(cache_key, website, email, method)
+                        metrics.record_row(row_timings)
+
+                    if cached:
+                        with results_lock:
+                            cache_hits += 1
+                    group = groups[group_key]
+                    for member in group:
+                        checkpoint.record(int(member), website=website, email=email)
+                    if len(group) > 1:
+                        msg = f"   -> Applied result to {len(group) - 1} duplicate row(s)"
+                        print(msg)
+                        if log_callback:
+                            log_callback(msg)
+                    if timings_log:
+                        record = {"index": int(index), "company": str(company), "method": method, "cached": bool(cached), "rows": len(group),
+                                  "seconds": {stage: round(seconds, 3) for stage, seconds in row_timings.seconds.items()}}
+                        with results_lock:
+                            timings_log.write(json.dumps(record) + "\n")
+                            timings_log.flush()
+                    if progress_callback:
+                        progress_callback(len(checkpoint.completed), total_companies)
+
+                    update_msg = "Updated: website and email"
+                    if log_callback:
+                        log_callback(update_msg)
+            except Exception as e:
+                msg = f"Critical Error in browser {worker_id}: {e}"
+                print(msg)
+                if log_callback:
+                    log_callback(msg)
+            finally:
+                try:
+                    driver.quit()
+                except:
+                    pass
+
+        feed_thread = threading.Thread(target=feeder, daemon=True)
+        feed_thread.start()
+        workers = [threading.Thread(target=worker, args=(i + 1,), daemon=True) for i in range(pool_size)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        stopped.set()
+        feed_thread.join()
+        if fatal_errors:
+            raise RuntimeError(f"Could not start the browser: {fatal_errors[0]}") from fatal_errors[0]
+
+        if fetcher and page_cache:
+            stats = fetcher.cache_stats
+            msg = f"Page cache: {stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} downloaded"
+            print(msg)
+            if log_callback:
+                log_callback(msg)
 
-            update_msg = "Updated: website and email"
+        if browser_restarts:
+            msg = f"Browser restarts: {browser_restarts}"
+            print(msg)
             if log_callback:
-                log_callback(update_msg)
+                log_callback(msg)
 
-            df.to_excel(OUTPUT_FILE, index=False)
+        write_started = time.perf_counter()
+        write_results(file_to_process, output_file, missing_columns_only(checkpoint.completed, partial_rows))
+        metrics.observe("write", time.perf_counter() - write_started)
+        if POSTPROCESS_RESULTS:
+            try:
+                # Only the emails this job wrote are cleaned; other rows stay as the sheet had them.
+                enriched = [index for index in checkpoint.completed if partial_rows.get(index) != 'website']
+                stats = postprocess_file(output_file, rows=enriched)
+                metrics.observe("postprocess", stats["seconds"])
+                msg = format_stats(stats)
+            except Exception as e:
+                msg = f"Post-processing failed, results left as found: {e}"
+            print(msg)
+            if log_callback:
+                log_callback(msg)
+        if len(checkpoint.completed) >= total_companies:
+            checkpoint.discard()
 
-        msg = f"Processing complete! Processed {processed_count} companies. Saved to {OUTPUT_FILE}"
+        msg = (f"Processing complete! Processed {processed_count} companies ({cache_hits} from cache, "
+               f"{duplicate_rows} duplicate rows reused, dedup ratio {dedup_ratio:.1%}, "
+               f"{skipped_rows} rows skipped as already enriched). Saved to {output_file}")
         print(msg)
         if log_callback:
             log_callback(msg)
 
+        for msg in ["Stage timings:"] + metrics.format_summary() + ["Search providers:"] + search_chain.format_summary():
+            print(msg)
+            if log_callback:
+                log_callback(msg)
+
     except Exception as e:
         msg = f"Critical Error: {e}"
         print(msg)
         if log_callback:
             log_callback(msg)
+        if checkpoint:
+            try:
+                write_results(file_to_process, output_file, missing_columns_only(checkpoint.completed, partial_rows))
+            except:
+                pass
+        # Raised on so the caller records the job as failed and keeps its input.
+        raise
     finally:
-        try:
-            driver.quit()
-        except:
-            pass
-
-    return OUTPUT_FILE
+        # The fetcher closes its page cache too.
+        if fetcher:
+            fetcher.close()
+        elif page_cache:
+            page_cache.close()
+        if result_cache:
+            result_cache.close()
+        if checkpoint:
+            checkpoint.close()
+        if timings_log:
+            timings_log.close()
+
+    return output_file
 
 if __name__ == "__main__":
     process_workflow(city="London", country="UK")
@@ -0,0 +1,127 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency buckets; one overflow bucket follows.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+# Display order; stages nest (a search includes its waits, a site scan its
+# page loads and parsing), so they do not add up to the row total. "wait" is
+# readiness polling after a navigation, "sleep" is politeness delay.
+# "driver_restart" counts browsers recycled or replaced after a crash.
+STAGES = [
+    'row', 'driver_start', 'driver_restart', 'search', 'page_load', 'http_fetch', 'parse',
+    'contact_crawl', 'alt_site_retry', 'wait', 'sleep', 'write', 'postprocess'
+]
+
+
+class RowTimings:
+    """Seconds spent in each stage while processing one row."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+
+class StageHistograms:
+    """Per-stage latency histograms, filled from RowTimings by worker threads.
+
+    to_dict() is JSON-safe and merge() adds one back in, so histograms from
+    many jobs (and worker processes) can be combined for the metrics endpoint.
+    """
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._observe(stage, seconds)
+
+    def record_row(self, row_timings):
+        with self._lock:
+            for stage, seconds in row_timings.seconds.items():
+                self._observe(stage, seconds)
+
+    def _observe(self, stage, seconds):
+        hist = self._stages.get(stage)
+        if hist is None:
+            hist = self._stages[stage] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)}
+        hist["count"] += 1
+        hist["sum"] += seconds
+        hist["max"] = max(hist["max"], seconds)
+        hist["buckets"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def merge(self, data):
+        if isinstance(data, str):
+            data = json.loads(data)
+        if not data or data.get("le") != list(LATENCY_BUCKETS):
+            return
+        with self._lock:
+            for stage, other in data["stages"].items():
+                hist = self._stages.setdefault(stage, {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1)})
+                hist["count"] += other["count"]
+                hist["sum"] += other["sum"]
+                hist["max"] = max(hist["max"], other["max"])
+                hist["buckets"] = [a + b for a, b in zip(hist["buckets"], other["buckets"])]
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "le": list(LATENCY_BUCKETS),
+                "stages": {stage: {**hist, "buckets": list(hist["buckets"])} for stage, hist in self._stages.items()},
+            }
+
+    def summary(self):
+        """count, total, mean, estimated p50/p95 and max per stage, in seconds."""
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: STAGES.index(item[0]) if item[0] in STAGES else len(STAGES))
+            return {
+                stage: {
+                    "count": hist["count"],
+                    "total": round(hist["sum"], 3),
+                    "mean": round(hist["sum"] / hist["count"], 3) if hist["count"] else 0.0,
+                    "p50": _quantile(hist, 0.5),
+                    "p95": _quantile(hist, 0.95),
+                    "max": round(hist["max"], 3),
+                }
+                for stage, hist in stages
+            }
+
+    def format_summary(self):
+        """One log line per stage, with its share of the total row time."""
+        summary = self.summary()
+        row_total = summary.get("row", {}).get("total") or 0
+        lines = []
+        for stage, stats in summary.items():
+            share = f", {stats['total'] / row_total:.0%} of row time" if row_total and stage not in ("row", "driver_restart", "write", "postprocess") else ""
+            lines.append(
+                f"   -> {stage}: {stats['count']}x, avg {stats['mean']:.2f}s, "
+                f"p95 <= {stats['p95']:.2f}s, total {stats['total']:.1f}s{share}"
+            )
+        return lines
+
+
+def _quantile(hist, q):
+    """Upper bound of the bucket holding the q-th observation (max for the overflow bucket)."""
+    if not hist["count"]:
+        return 0.0
+    target = q * hist["count"]
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS, hist["buckets"]):
+        seen += count
+        if seen >= target:
+            return min(bound, round(hist["max"], 3))
+    return round(hist["max"], 3)
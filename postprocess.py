@@ -0,0 +1,195 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from sheets import read_rows, SheetWriter
+
+DEFAULT_INPUT = 'companies_updated.xlsx'
+CONFIDENCE_COLUMN = 'Email Confidence'
+
+# Also used by the crawler's per-page filtering in main.py.
+JUNK_EXTENSIONS = frozenset(['png', 'jpg', 'jpeg', 'gif', 'css', 'js', 'svg', 'webp', 'mp4', 'woff', 'woff2', 'ttf', 'eot', 'ico'])
+JUNK_EMAIL_PATTERNS = ['sentry', 'example.com', 'domain.com', 'email.com', 'your-email', 'youremail', 'test@', '@test', 'noreply@example']
+MISSING_VALUES = ['', 'nan', 'not found', 'error', 'none']
+
+FREE_MAIL_DOMAINS = frozenset([
+    'gmail.com', 'googlemail.com', 'hotmail.com', 'hotmail.co.uk', 'outlook.com', 'live.com', 'live.co.uk',
+    'yahoo.com', 'yahoo.co.uk', 'icloud.com', 'me.com', 'aol.com', 'btinternet.com', 'sky.com',
+    'protonmail.com', 'proton.me', 'gmx.com', 'gmx.de', 'web.de', 'mail.com', 'zoho.com'
+])
+ROLE_LOCAL_PARTS = frozenset([
+    'info', 'contact', 'hello', 'enquiries', 'enquiry', 'sales', 'office', 'admin', 'mail', 'support',
+    'reception', 'bookings', 'accounts'
+])
+
+# Per-email confidence: BASE plus whichever adjustments apply, clipped to 0..1.
+CONFIDENCE_BASE = 0.3
+CONFIDENCE_DOMAIN_MATCH = 0.5
+CONFIDENCE_FREE_MAIL = 0.2
+CONFIDENCE_ROLE_ADDRESS = 0.1
+CONFIDENCE_SHARED = -0.3
+
+_VALID_EMAIL = r"[a-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[a-z0-9!#$%&'*+/=?^_`{|}~-]+)*@(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z0-9-]{2,63}"
+_JUNK_EMAIL = '|'.join(pattern.replace('.', r'\.') for pattern in JUNK_EMAIL_PATTERNS)
+_SITE_HOST = r'^(?:[a-z][a-z0-9+.-]*://)?(?:www\.)?([^/:?#\s]+)'
+# The registrable part of a host: acme.co.uk for shop.acme.co.uk, acme.com for mail.acme.com.
+_BASE_DOMAIN = r'([a-z0-9-]+\.(?:(?:co|com|org|net|ac|gov|edu)\.[a-z]{2}|[a-z0-9-]{2,63}))$'
+
+
+def valid_mask(series):
+    """Column-wise has_valid_data: True where a cell holds a real value."""
+    return series.notna() & ~series.astype(str).str.strip().str.lower().isin(MISSING_VALUES)
+
+
+def _base_domain(hosts):
+    return hosts.str.extract(_BASE_DOMAIN, expand=False).fillna(hosts)
+
+
+def email_table(df, website_column='Website', email_column='Email'):
+    """One row per (sheet row, email), normalized and deduplicated, with its checks.
+
+    Columns: row, email, valid, domain_match, free_mail, role_address,
+    shared_rows (how many different websites list the email) and
+    confidence (0 for invalid addresses). Nothing is looked up online.
+    """
+    emails = df[email_column][valid_mask(df[email_column])].astype(str)
+    emails = emails.str.split(r'[,;\s]+', regex=True).explode()
+    emails = (emails.str.lower()
+              .str.replace(r'^mailto:', '', regex=True)
+              .str.replace(r'\?.*$', '', regex=True)
+              .str.strip(".-_,;:'\"<>()[]"))
+    emails = emails[emails.str.len() > 0]
+    table = pd.DataFrame({'row': emails.index, 'email': emails.to_numpy()}).drop_duplicates(ignore_index=True)
+
+    parts = table['email'].str.extract(r'^([^@]*)@([^@]*)$').fillna('')
+    local, domain = parts[0], parts[1]
+    tld = domain.str.rsplit('.', n=1).str[-1]
+    table['valid'] = (
+        table['email'].str.fullmatch(_VALID_EMAIL)
+        & table['email'].str.len().between(6, 254)
+        & (local.str.len() <= 64)
+        & ~tld.isin(JUNK_EXTENSIONS)
+        & ~table['email'].str.contains(_JUNK_EMAIL, regex=True)
+    )
+
+    websites = df[website_column][valid_mask(df[website_column])].astype(str).str.lower()
+    site_domains = _base_domain(websites.str.extract(_SITE_HOST, expand=False).dropna())
+    site_domain = site_domains.reindex(table['row']).to_numpy()
+    table['domain_match'] = _base_domain(domain).to_numpy() == site_domain
+    table['free_mail'] = domain.isin(FREE_MAIL_DOMAINS)
+    table['role_address'] = local.isin(ROLE_LOCAL_PARTS)
+
+    # The same address on several companies' sites is usually the web
+    # designer's or a directory's, not the company's.
+    site_key = pd.Series(site_domain, dtype=object).fillna(table['row'].astype(str))
+    table['shared_rows'] = site_key.groupby(table['email']).transform('nunique')
+    shared = (table['shared_rows'] > 1) & ~table['domain_match']
+
+    confidence = (
+        CONFIDENCE_BASE
+        + CONFIDENCE_DOMAIN_MATCH * table['domain_match']
+        + CONFIDENCE_FREE_MAIL * (table['free_mail'] & ~table['domain_match'])
+        + CONFIDENCE_ROLE_ADDRESS * table['role_address']
+        + CONFIDENCE_SHARED * shared
+    )
+    table['confidence'] = np.where(table['valid'], confidence.clip(0, 1), 0.0).round(2)
+    return table
+
+
+def postprocess(df, website_column='Website', email_column='Email'):
+    """Returns (cleaned copy of df, email_table(df)).
+
+    Email keeps only valid addresses, most confident first, and becomes
+    "Not Found" where none were valid; CONFIDENCE_COLUMN holds the best
+    email's score.
+    """
+    table = email_table(df, website_column, email_column)
+    good = table[table['valid']].sort_values(['row', 'confidence'], ascending=[True, False], kind='stable')
+
+    cleaned = df.copy()
+    checked = cleaned.index[cleaned.index.isin(table['row'])]
+    cleaned[email_column] = cleaned[email_column].astype(object)
+    cleaned.loc[checked, email_column] = good.groupby('row')['email'].agg(', '.join).reindex(checked).fillna('Not Found')
+    cleaned[CONFIDENCE_COLUMN] = good.groupby('row')['confidence'].max().reindex(cleaned.index)
+    return cleaned, table
+
+
+def _read_result_columns(path, website_column, email_column):
+    rows = read_rows(path, [website_column, email_column])
+    header = next(rows)
+    return pd.DataFrame(list(rows), columns=header)
+
+
+def postprocess_file(input_path=DEFAULT_INPUT, output_path=None, emails_path=None, rows=None):
+    """Cleans a results sheet in place (or into output_path), without re-crawling.
+
+    Only the Website and Email columns are loaded; the sheet is then copied
+    row by row, as text for CSVs, with Email and CONFIDENCE_COLUMN set on
+    the rows given by position in rows (every row when None). Other rows
+    are copied unchanged, though their emails still count towards shared.
+    emails_path, if given, receives the per-email table as CSV. Returns
+    counts for the log: rows, emails, invalid, domain_match, shared, seconds.
+    """
+    start = time.perf_counter()
+    df = _read_result_columns(input_path, 'Website', 'Email')
+    cleaned, table = postprocess(df)
+    if rows is not None:
+        table = table[table['row'].isin(rows)]
+    targets = cleaned.index if rows is None else cleaned.index.intersection(list(rows))
+    emails = cleaned['Email'][targets].to_dict()
+    confidence = cleaned[CONFIDENCE_COLUMN][targets].dropna().to_dict()
+
+    output_path = output_path or input_path
+    sheet = read_rows(input_path)
+    header = list(next(sheet))
+    if CONFIDENCE_COLUMN not in header:
+        header.append(CONFIDENCE_COLUMN)
+    email_col, confidence_col = header.index('Email'), header.index(CONFIDENCE_COLUMN)
+
+    base, ext = os.path.splitext(output_path)
+    temp_path = f"{base}.tmp{ext}"
+    writer = SheetWriter(temp_path)
+    try:
+        writer.write(header)
+        for index, row in enumerate(sheet):
+            row = list(row) + [""] * (len(header) - len(row))
+            if index in emails:
+                row[email_col] = emails[index]
+                row[confidence_col] = confidence.get(index, "")
+            writer.write(row)
+    finally:
+        writer.close()
+    os.replace(temp_path, output_path)
+
+    if emails_path:
+        table.to_csv(emails_path, index=False)
+    return {
+        "rows": len(targets),
+        "emails": len(table),
+        "invalid": int((~table['valid']).sum()),
+        "domain_match": int(table['domain_match'].sum()),
+        "shared": int(((table['shared_rows'] > 1) & ~table['domain_match']).sum()),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def format_stats(stats):
+    return (f"Post-processing: {stats['emails']} email(s) in {stats['rows']} rows checked in {stats['seconds']:.1f}s, "
+            f"{stats['invalid']} invalid removed, {stats['domain_match']} match their website, "
+            f"{stats['shared']} shared across companies")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalize, validate and score the emails in a results sheet.")
+    parser.add_argument("input", nargs="?", default=DEFAULT_INPUT, help=f"results .xlsx or .csv (default {DEFAULT_INPUT})")
+    parser.add_argument("-o", "--output", help="write here instead of updating the input in place")
+    parser.add_argument("--emails", help="also write one row per email with its checks to this CSV")
+    args = parser.parse_args()
+    print(format_stats(postprocess_file(args.input, args.output, args.emails)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import abc
+import concurrent.futures
+import csv
+import os
+import re
+import threading
+import time
+
+KNOWN_DOMAINS_FILE = 'known_domains.csv'
+# Order tried when a job does not name its own providers.
+DEFAULT_PROVIDERS = ['local', 'domain_guess', 'browser']
+
+# TLDs tried by the domain guesser, by the country at the end of the location.
+COUNTRY_TLDS = {
+    'uk': ['.co.uk', '.com', '.uk'],
+    'united kingdom': ['.co.uk', '.com', '.uk'],
+    'england': ['.co.uk', '.com', '.uk'],
+    'qatar': ['.qa', '.com.qa', '.com'],
+    'ireland': ['.ie', '.com'],
+    'usa': ['.com', '.us'],
+    'us': ['.com', '.us'],
+    'united states': ['.com', '.us'],
+}
+DEFAULT_TLDS = ['.com']
+GUESS_TIMEOUT = 6
+# Joined names shorter than this are too generic to guess a domain from.
+MIN_GUESS_LENGTH = 5
+_PARKED_PAGE = re.compile(
+    r'domain (?:name )?(?:is )?for sale|buy this domain|this domain is parked|parked free|'
+    r'domain has expired|sedoparking|hugedomains|dan\.com',
+    re.IGNORECASE
+)
+_HIDDEN_BLOCKS = re.compile(r'<(script|style|noscript|template)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAGS = re.compile(r'<[^>]+>')
+
+
+def _page_text(html):
+    return ' '.join(_TAGS.sub(' ', _HIDDEN_BLOCKS.sub(' ', html)).lower().split())
+
+
+class SearchError(Exception):
+    """A search could not run (CAPTCHA, timeout, browser down), as opposed
+    to running and finding no match; such rows must not be cached."""
+
+
+class SearchProvider(abc.ABC):
+    """Finds a company's website.
+
+    find() returns (url, method), or (None, None) when the provider has no
+    answer; available is False when the provider cannot run at all (e.g. no
+    lookup file, or no HTTP fetcher).
+    """
+
+    name = None
+    available = True
+
+    @abc.abstractmethod
+    def find(self, company_name, name_tokens, location, driver=None, log_callback=None, timings=None):
+        """(url, method) for the company, or (None, None); raises if it cannot search."""
+
+
+class LocalLookupProvider(SearchProvider):
+    """Known company -> website mappings from a CSV with Name and Website
+    (or Domain) columns, and an optional Location column."""
+
+    name = 'local'
+
+    def __init__(self, name_key, path=None):
+        self._name_key = name_key
+        self._entries = {}
+        path = path or KNOWN_DOMAINS_FILE
+        if os.path.exists(path):
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                for row in csv.DictReader(f):
+                    row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+                    website = row.get('website') or row.get('domain')
+                    if not row.get('name') or not website:
+                        continue
+                    if not website.startswith(('http://', 'https://')):
+                        website = f"https://{website}"
+                    self._entries[self._key(row['name'], row.get('location', ''))] = website
+        self.available = bool(self._entries)
+
+    def _key(self, company_name, location):
+        return f"{self._name_key(company_name)}|{' '.join(str(location).lower().split())}"
+
+    def find(self, company_name, name_tokens, location, driver=None, log_callback=None, timings=None):
+        url = self._entries.get(self._key(company_name, location)) or self._entries.get(self._key(company_name, ''))
+        if url:
+            print(f"   -> [METHOD: LOCAL] Known website: {url}")
+            return url, "local"
+        return None, None
+
+
+class DomainGuessProvider(SearchProvider):
+    """Probes domains built from the name tokens (acmeplumbing.co.uk,
+    acme-plumbing.com, ...) over HTTP, all at once, and accepts the first
+    in guess order whose visible text mentions every token and the city and
+    is not a parking page; a namesake elsewhere rarely names the same city."""
+
+    name = 'domain_guess'
+
+    def __init__(self, fetcher, city, blocklist=None, timeout=GUESS_TIMEOUT):
+        self.fetcher = fetcher
+        self.city = ' '.join(str(city or '').lower().split())
+        self.blocklist = blocklist
+        self.timeout = timeout
+        self.available = fetcher is not None and bool(self.city)
+
+    def candidates(self, name_tokens, location):
+        joined = ''.join(name_tokens)
+        if len(joined) < MIN_GUESS_LENGTH:
+            return []
+        place = ' '.join(str(location).lower().split())
+        tlds = next((tlds for country, tlds in COUNTRY_TLDS.items() if place == country or place.endswith(f" {country}")), DEFAULT_TLDS)
+        stems = [joined] + (['-'.join(name_tokens)] if len(name_tokens) > 1 else [])
+        hosts = [f"{stem}{tld}" for tld in tlds for stem in stems]
+        return [f"https://www.{host}/" for host in hosts if not (self.blocklist and self.blocklist.is_blocked(host))]
+
+    def find(self, company_name, name_tokens, location, driver=None, log_callback=None, timings=None):
+        urls = self.candidates(name_tokens, location)
+        if not urls:
+            return None, None
+
+        pending = [(url, self.fetcher.submit(url)) for url in urls]
+        deadline = time.monotonic() + self.timeout
+        try:
+            for url, future in pending:
+                try:
+                    html = future.result(timeout=max(deadline - time.monotonic(), 0))
+                except concurrent.futures.TimeoutError:
+                    break
+                if not html or _PARKED_PAGE.search(html):
+                    continue
+                text = _page_text(html)
+                if self.city in text and all(token in text for token in name_tokens):
+                    print(f"   -> [METHOD: DOMAIN GUESS] Found live site: {url}")
+                    return url, "domain_guess"
+        finally:
+            for _, future in pending:
+                future.cancel()
+        return None, None
+
+
+class ProviderChain:
+    """Tries providers in order until one finds a website, timing each one.
+
+    Time per provider goes into the row's timings as "search.<name>", and
+    calls / hits / seconds are totalled per provider for the job summary.
+    """
+
+    def __init__(self, providers):
+        self.providers = [provider for provider in providers if provider.available]
+        self._stats = {provider.name: {"calls": 0, "hits": 0, "seconds": 0.0} for provider in self.providers}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self):
+        return [provider.name for provider in self.providers]
+
+    def find(self, company_name, name_tokens, location, driver=None, log_callback=None, timings=None, after=None):
+        """Returns (url, method, provider_name); all None when no provider found anything.
+
+        after skips the providers up to and including that one, so a retry
+        asks the next resolver; the last provider is retried as itself.
+        Raises SearchError when nothing was found and a provider failed, so
+        the failure is not mistaken for a company with no website.
+        """
+        providers = self.providers
+        if after in self.names:
+            position = self.names.index(after)
+            providers = providers[position + 1:] or providers[position:]
+
+        failure = None
+        for provider in providers:
+            start = time.perf_counter()
+            url, method = None, None
+            try:
+                url, method = provider.find(company_name, name_tokens, location, driver, log_callback, timings)
+            except Exception as e:
+                print(f"   -> {provider.name} search failed: {e}")
+                failure = failure or SearchError(f"{provider.name} search failed: {e}")
+            elapsed = time.perf_counter() - start
+            if timings:
+                timings.add(f"search.{provider.name}", elapsed)
+            with self._lock:
+                stats = self._stats[provider.name]
+                stats["calls"] += 1
+                stats["seconds"] += elapsed
+                if url:
+                    stats["hits"] += 1
+            if url:
+                return url, method, provider.name
+        if failure:
+            raise failure
+        return None, None, None
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def format_summary(self):
+        lines = []
+        for name, stats in self.stats().items():
+            if not stats["calls"]:
+                continue
+            lines.append(
+                f"   -> {name}: {stats['hits']}/{stats['calls']} found "
+                f"({stats['hits'] / stats['calls']:.0%}), avg {stats['seconds'] / stats['calls']:.2f}s"
+            )
+        return lines
@@ -1,17 +1,61 @@
 import asyncio
 import os
-from fastapi import FastAPI, File, UploadFile, Form
+from fastapi import FastAPI, File, UploadFile, Form, Header
 from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from typing import Optional
-import tempfile
 import json
+import re
+import uuid
 from datetime import datetime
 from pathlib import Path
-from main import process_workflow
+from contextlib import asynccontextmanager
+from main import DEFAULT_POOL_SIZE, MAX_POOL_SIZE, ENRICH_MODES, DEFAULT_ENRICH_MODE
+from jobs import JobStore, job_dir
+from scheduler import JobScheduler, MAX_BROWSERS
+from worker import run_job
+from metrics import StageHistograms
+from logbus import LogBus
+
+# "inline" runs jobs in threads inside this process; "external" leaves them
+# in the job store for worker.py processes to claim.
+WORKER_MODE = os.environ.get("SCRAPER_WORKER_MODE", "inline")
+EXTERNAL_WORKERS = WORKER_MODE == "external"
+LOG_RELAY_INTERVAL = 0.5
+
+log_bus = LogBus()
+stop_flags = {}
+
+job_store = JobStore()
+if not EXTERNAL_WORKERS:
+    job_store.mark_interrupted()
+scheduler = JobScheduler()
+
+
+async def relay_worker_logs():
+    """Copies log lines written by worker processes onto the local log bus."""
+    last_id = await asyncio.to_thread(job_store.last_log_id)
+    while True:
+        rows = await asyncio.to_thread(job_store.logs_after, last_id)
+        for log_id, job_id, message in rows:
+            last_id = log_id
+            # The durable row id doubles as the SSE event id, so a client's
+            # Last-Event-ID still means the same line after an API restart.
+            log_bus.publish(job_id, message, log_id)
+        if not rows:
+            await asyncio.sleep(LOG_RELAY_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    relay = asyncio.create_task(relay_worker_logs()) if EXTERNAL_WORKERS else None
+    yield
+    if relay:
+        relay.cancel()
+
 
-app = FastAPI(title="Company Web Scraper API")
+app = FastAPI(title="Company Web Scraper API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,76 +65,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-log_streams = {}
-stop_flags = {}
+MEDIA_TYPES = {
+    '.xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    '.csv': "text/csv",
+}
 
 
 class LogCollector:
     def __init__(self, job_id):
         self.job_id = job_id
-        self.logs = []
 
     def add_log(self, message):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {message}"
-        self.logs.append(log_entry)
-        log_streams[self.job_id].append(log_entry)
+        log_bus.publish(self.job_id, f"[{timestamp}] {message}")
 
 
-def process_file_task_sync(file_path: str, city: str, country: str, job_id: str):
+def process_file_task_sync(file_path: str, city: str, country: str, job_id: str, pool_size: int = DEFAULT_POOL_SIZE, force_refresh: bool = False, enrich_mode: str = DEFAULT_ENRICH_MODE):
     log_collector = LogCollector(job_id)
 
     def log_callback(msg):
         log_collector.add_log(msg)
 
+    def emit_event(marker):
+        log_bus.publish(job_id, marker)
+
     def stop_check():
         return stop_flags.get(job_id, False)
 
     try:
-        log_callback(f"Starting processing for location: {city} {country}")
-        output_file = process_workflow(
-            input_file=file_path,
-            city=city,
-            country=country,
-            log_callback=log_callback,
-            stop_check=stop_check
-        )
-
-        if stop_check():
-            log_callback(f"Processing stopped by user! Partial results saved to: {output_file}")
-            if job_id in log_streams:
-                log_streams[job_id].append(f"__STOPPED__{output_file}")
-        else:
-            log_callback(f"Processing completed! Output file: {output_file}")
-            if job_id in log_streams:
-                log_streams[job_id].append(f"__COMPLETED__{output_file}")
-
-    except Exception as e:
-        log_callback(f"Error during processing: {str(e)}")
-        if job_id in log_streams:
-            log_streams[job_id].append(f"__ERROR__{str(e)}")
+        run_job(job_store, job_id, file_path, city, country, pool_size, force_refresh, log_callback, emit_event, stop_check, enrich_mode)
     finally:
         if job_id in stop_flags:
             del stop_flags[job_id]
-        try:
-            os.remove(file_path)
-        except:
-            pass
 
-async def process_file_task(file_path: str, city: str, country: str, job_id: str):
-    import threading
-    thread = threading.Thread(
-        target=process_file_task_sync,
-        args=(file_path, city, country, job_id)
-    )
-    thread.start()
+async def process_file_task(file_path: str, city: str, country: str, job_id: str, pool_size: int = DEFAULT_POOL_SIZE, force_refresh: bool = False, priority: int = 0, enrich_mode: str = DEFAULT_ENRICH_MODE):
+    if EXTERNAL_WORKERS:
+        # The job row is already queued; a worker process will claim it.
+        position = job_store.queue_position(job_id)
+        if position:
+            LogCollector(job_id).add_log(f"Waiting for a worker: position {position} in queue")
+        return position
+
+    def run(browsers):
+        if browsers < pool_size:
+            LogCollector(job_id).add_log(f"Browser limit reached: starting with {browsers} of {pool_size} requested browser(s)")
+        process_file_task_sync(file_path, city, country, job_id, browsers, force_refresh, enrich_mode)
+
+    position = scheduler.submit(job_id, run, pool_size=pool_size, priority=priority)
+    if position:
+        LogCollector(job_id).add_log(f"Waiting for a free slot: position {position} in queue")
+    return position
 
 
 @app.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
     city: str = Form(...),
-    country: str = Form(...)
+    country: str = Form(...),
+    pool_size: int = Form(DEFAULT_POOL_SIZE),
+    force_refresh: bool = Form(False),
+    priority: int = Form(0),
+    enrich_mode: str = Form(DEFAULT_ENRICH_MODE)
 ):
     if not city or not city.strip():
         return {"error": "City is required and cannot be empty"}
@@ -98,105 +133,208 @@ async def upload_file(
     if not country or not country.strip():
         return {"error": "Country is required and cannot be empty"}
 
+    if pool_size < 1 or pool_size > MAX_POOL_SIZE:
+        return {"error": f"Pool size must be between 1 and {MAX_POOL_SIZE}"}
+
     if not (file.filename.endswith('.xlsx') or file.filename.endswith('.csv')):
         return {"error": "Only .xlsx and .csv files are supported"}
 
-    job_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
+    if enrich_mode not in ENRICH_MODES:
+        return {"error": f"Enrichment mode must be one of: {', '.join(ENRICH_MODES)}"}
 
-    log_streams[job_id] = []
-    stop_flags[job_id] = False
+    safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', os.path.basename(file.filename))
+    job_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}_{safe_name}"
+    input_path = os.path.join(job_dir(job_id), 'input' + os.path.splitext(safe_name)[1])
 
-    temp_file = tempfile.NamedTemporaryFile(
-        delete=False,
-        suffix='.xlsx' if file.filename.endswith('.xlsx') else '.csv'
-    )
+    log_bus.open(job_id)
+    stop_flags[job_id] = False
 
     try:
         contents = await file.read()
-        temp_file.write(contents)
-        temp_file.close()
+        with open(input_path, 'wb') as f:
+            f.write(contents)
 
-        asyncio.create_task(process_file_task(temp_file.name, city, country, job_id))
+        job_store.create(
+            job_id,
+            filename=file.filename,
+            city=city,
+            country=country,
+            pool_size=pool_size,
+            priority=priority,
+            force_refresh=int(force_refresh),
+            enrich_mode=enrich_mode,
+            input_path=input_path
+        )
+        queue_position = await process_file_task(input_path, city, country, job_id, pool_size, force_refresh, priority, enrich_mode)
 
         return {
             "message": "File uploaded successfully. Processing started.",
             "job_id": job_id,
             "city": city,
             "country": country,
+            "pool_size": pool_size,
+            "force_refresh": force_refresh,
+            "enrich_mode": enrich_mode,
+            "priority": priority,
+            "queue_position": queue_position,
             "filename": file.filename
         }
 
     except Exception as e:
-        os.remove(temp_file.name)
+        try:
+            os.remove(input_path)
+        except:
+            pass
         return {"error": f"Failed to process file: {str(e)}"}
 
 
-@app.get("/logs/{job_id}")
-async def stream_logs(job_id: str):
-    async def event_generator():
-        sent_count = 0
-
-        while True:
-            if job_id not in log_streams:
-                yield f"data: {json.dumps({'error': 'Job not found'})}\n\n"
-                break
-
-            logs = log_streams[job_id]
-
-            while sent_count < len(logs):
-                log_entry = logs[sent_count]
+def sse_payload(line):
+    """The SSE data object for one log line or end-of-job marker."""
+    if line.startswith("__COMPLETED__"):
+        return {'type': 'completed', 'output_file': line.replace("__COMPLETED__", "")}
+    if line.startswith("__STOPPED__"):
+        return {'type': 'stopped', 'output_file': line.replace("__STOPPED__", "")}
+    if line == "__CANCELLED__":
+        return {'type': 'cancelled'}
+    if line.startswith("__ERROR__"):
+        return {'type': 'error', 'message': line.replace("__ERROR__", "")}
+    return {'type': 'log', 'message': line}
 
-                if log_entry.startswith("__COMPLETED__"):
-                    output_file = log_entry.replace("__COMPLETED__", "")
-                    yield f"data: {json.dumps({'type': 'completed', 'output_file': output_file})}\n\n"
-                    await asyncio.sleep(2)
-                    del log_streams[job_id]
-                    return
 
-                elif log_entry.startswith("__STOPPED__"):
-                    output_file = log_entry.replace("__STOPPED__", "")
-                    yield f"data: {json.dumps({'type': 'stopped', 'output_file': output_file})}\n\n"
-                    await asyncio.sleep(2)
-                    del log_streams[job_id]
-                    return
-
-                elif log_entry.startswith("__ERROR__"):
-                    error_msg = log_entry.replace("__ERROR__", "")
-                    yield f"data: {json.dumps({'type': 'error', 'message': error_msg})}\n\n"
-                    await asyncio.sleep(2)
-                    del log_streams[job_id]
-                    return
+@app.get("/logs/{job_id}")
+async def stream_logs(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """Streams a job's log as SSE; a reconnecting client's Last-Event-ID
+    picks up after the last line it saw, as far back as the buffer goes."""
+    if EXTERNAL_WORKERS and job_id not in log_bus:
+        job = job_store.get(job_id)
+        if job and job["status"] in ("queued", "running"):
+            log_bus.open(job_id)
 
-                else:
-                    yield f"data: {json.dumps({'type': 'log', 'message': log_entry})}\n\n"
+    try:
+        after = int(last_event_id or 0)
+    except ValueError:
+        after = 0
 
-                sent_count += 1
+    async def event_generator():
+        if job_id not in log_bus:
+            yield f"data: {json.dumps({'type': 'error', 'message': 'Job not found'})}\n\n"
+            return
 
-            await asyncio.sleep(0.5)
+        async for item in log_bus.subscribe(job_id, after):
+            if item is None:
+                yield ": keepalive\n\n"
+                continue
+            seq, line = item
+            yield f"id: {seq}\ndata: {json.dumps(sse_payload(line))}\n\n"
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
 @app.post("/stop/{job_id}")
 async def stop_job(job_id: str):
-    if job_id not in log_streams:
+    if EXTERNAL_WORKERS:
+        if not job_store.get(job_id):
+            return {"error": "Job not found"}
+        if job_store.cancel_queued(job_id):
+            job_store.append_log(job_id, f"[{JobStore.now()}] Job cancelled before it started")
+            job_store.append_log(job_id, "__CANCELLED__")
+            return {"message": "Queued job cancelled", "job_id": job_id}
+        job_store.update(job_id, stop_requested=1)
+        return {"message": "Stop signal sent", "job_id": job_id}
+
+    if not log_bus.active(job_id):
         return {"error": "Job not found"}
 
+    if scheduler.cancel(job_id):
+        job_store.update(job_id, status="cancelled", finished_at=JobStore.now())
+        stop_flags.pop(job_id, None)
+        LogCollector(job_id).add_log("Job cancelled before it started")
+        log_bus.publish(job_id, "__CANCELLED__")
+        return {"message": "Queued job cancelled", "job_id": job_id}
+
     stop_flags[job_id] = True
     return {"message": "Stop signal sent", "job_id": job_id}
 
 
-@app.get("/download/{filename}")
-async def download_file(filename: str):
-    file_path = filename
+@app.post("/resume/{job_id}")
+async def resume_job(job_id: str):
+    job = job_store.get(job_id)
+    if not job:
+        return {"error": "Job not found"}
+
+    if job["status"] in ("queued", "running"):
+        return {"error": "Job is already running"}
+
+    if job["status"] == "completed":
+        return {"error": "Job is already completed"}
+
+    if not job["input_path"] or not os.path.exists(job["input_path"]):
+        return {"error": "Input file for this job is no longer available"}
+
+    log_bus.open(job_id)
+    stop_flags[job_id] = False
+    job_store.update(job_id, status="queued", error=None, finished_at=None, stop_requested=0)
+    queue_position = await process_file_task(job["input_path"], job["city"], job["country"], job_id, job["pool_size"], bool(job["force_refresh"]), job["priority"] or 0, job["enrich_mode"] or DEFAULT_ENRICH_MODE)
+
+    return {"message": "Job resumed from checkpoint", "job_id": job_id, "queue_position": queue_position}
+
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    return {"jobs": job_store.list(limit)}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if not job:
+        return {"error": "Job not found"}
+    job["queue_position"] = job_store.queue_position(job_id) if EXTERNAL_WORKERS else scheduler.position(job_id)
+    if job.get("stage_timings"):
+        metrics = StageHistograms()
+        metrics.merge(job["stage_timings"])
+        job["stage_timings"] = metrics.summary()
+    return job
+
+
+@app.get("/metrics")
+async def get_metrics(job_id: Optional[str] = None, limit: int = 500):
+    """Stage latency histograms merged over recent finished jobs, or for one job."""
+    if job_id:
+        job = job_store.get(job_id)
+        if not job:
+            return {"error": "Job not found"}
+        stored = [job["stage_timings"]] if job.get("stage_timings") else []
+    else:
+        stored = job_store.stage_timings(limit)
+
+    metrics = StageHistograms()
+    for data in stored:
+        metrics.merge(data)
+    return {"jobs": len(stored), "summary": metrics.summary(), "histograms": metrics.to_dict()}
+
+
+@app.get("/scheduler")
+async def scheduler_status():
+    if EXTERNAL_WORKERS:
+        return {"mode": WORKER_MODE, **job_store.stats(), "max_browsers": MAX_BROWSERS}
+    return {"mode": WORKER_MODE, **scheduler.status()}
+
+
+@app.get("/download/{job_id}")
+async def download_file(job_id: str):
+    job = job_store.get(job_id)
+    if not job:
+        return {"error": "Job not found"}
 
-    if not os.path.exists(file_path):
+    file_path = job["output_path"]
+    if not file_path or not os.path.exists(file_path):
         return {"error": "File not found"}
 
     return FileResponse(
         file_path,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=os.path.basename(file_path)
+        media_type=MEDIA_TYPES.get(os.path.splitext(file_path)[1], "application/octet-stream"),
+        filename=f"{os.path.splitext(job['filename'])[0]}_updated{os.path.splitext(file_path)[1]}"
     )
 
 
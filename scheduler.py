@@ -0,0 +1,86 @@
+import heapq
+import itertools
+import threading
+
+MAX_RUNNING_JOBS = 2
+MAX_BROWSERS = 4
+
+
+class JobScheduler:
+    """Runs queued jobs under global caps on concurrent jobs and browser instances.
+
+    Jobs wait in a priority queue (higher priority first, FIFO within a
+    priority). A job starts once a job slot and at least one browser are free;
+    it is granted up to its requested pool size from the free browsers.
+    """
+
+    def __init__(self, max_jobs=MAX_RUNNING_JOBS, max_browsers=MAX_BROWSERS):
+        self.max_jobs = max_jobs
+        self.max_browsers = max_browsers
+        self._queue = []
+        self._pending = {}
+        self._running = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, target, pool_size=1, priority=0):
+        """Queues target(browsers) to run as job_id. Returns the queue position (0 if started)."""
+        with self._lock:
+            heapq.heappush(self._queue, (-priority, next(self._seq), job_id))
+            self._pending[job_id] = (pool_size, target)
+        self._dispatch()
+        return self.position(job_id)
+
+    def cancel(self, job_id):
+        """Removes a job that has not started yet. Returns False if it is not queued."""
+        with self._lock:
+            if job_id not in self._pending:
+                return False
+            del self._pending[job_id]
+            self._queue = [entry for entry in self._queue if entry[2] != job_id]
+            heapq.heapify(self._queue)
+        return True
+
+    def is_queued(self, job_id):
+        with self._lock:
+            return job_id in self._pending
+
+    def position(self, job_id):
+        """1-based position among waiting jobs, or 0 if the job is not waiting."""
+        with self._lock:
+            if job_id not in self._pending:
+                return 0
+            for position, entry in enumerate(sorted(self._queue), 1):
+                if entry[2] == job_id:
+                    return position
+        return 0
+
+    def status(self):
+        with self._lock:
+            return {
+                "running_jobs": len(self._running),
+                "queued_jobs": len(self._pending),
+                "browsers_in_use": sum(self._running.values()),
+                "max_jobs": self.max_jobs,
+                "max_browsers": self.max_browsers,
+            }
+
+    def _dispatch(self):
+        with self._lock:
+            while self._queue and len(self._running) < self.max_jobs:
+                free_browsers = self.max_browsers - sum(self._running.values())
+                if free_browsers < 1:
+                    break
+                _, _, job_id = heapq.heappop(self._queue)
+                pool_size, target = self._pending.pop(job_id)
+                browsers = max(1, min(pool_size, free_browsers))
+                self._running[job_id] = browsers
+                threading.Thread(target=self._run, args=(job_id, target, browsers), daemon=True).start()
+
+    def _run(self, job_id, target, browsers):
+        try:
+            target(browsers)
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            self._dispatch()
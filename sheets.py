@@ -0,0 +1,157 @@
+import csv
+import os
+
+import openpyxl
+import pandas as pd
+
+NAME_COLUMN = 'Name'
+RESULT_COLUMNS = ['Website', 'Email']
+CSV_CHUNK_ROWS = 10000
+
+
+def is_csv(path):
+    return path.lower().endswith('.csv')
+
+
+def read_rows(path, columns=None):
+    """Yields the header, then every data row as a list, without loading the sheet.
+
+    CSVs are read in chunks as text (only columns, if given); for workbooks
+    the first sheet is read with openpyxl in read-only mode. Row positions
+    match what pd.read_csv / pd.read_excel would have given as the index.
+    """
+    if is_csv(path):
+        yield from _read_csv_rows(path, columns)
+    else:
+        yield from _read_xlsx_rows(path, columns)
+
+
+def _read_csv_rows(path, columns):
+    header = list(pd.read_csv(path, nrows=0).columns)
+    if columns:
+        _check_columns(header, columns)
+        header = [column for column in header if column in columns]
+    yield header
+    chunks = pd.read_csv(path, dtype=str, keep_default_na=False, usecols=columns, chunksize=CSV_CHUNK_ROWS)
+    for chunk in chunks:
+        yield from (list(row) for row in chunk[header].itertuples(index=False, name=None))
+
+
+def _read_xlsx_rows(path, columns):
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, None) or [])
+        while header and header[-1] is None:
+            header.pop()
+        if columns:
+            _check_columns(header, columns)
+        positions = [header.index(column) for column in columns] if columns else range(len(header))
+        yield [header[i] for i in positions]
+
+        # Blank rows count towards row positions unless they trail the data.
+        blank_rows = 0
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in positions]
+            if all(value is None for value in row):
+                blank_rows += 1
+                continue
+            for _ in range(blank_rows):
+                yield [None] * len(values)
+            blank_rows = 0
+            yield values
+    finally:
+        workbook.close()
+
+
+def _check_columns(header, columns):
+    missing = [column for column in columns if column not in header]
+    if missing:
+        raise ValueError(f"Input file has no {', '.join(repr(c) for c in missing)} column")
+
+
+def iter_companies(path):
+    """Yields (row_index, name) for every row with a non-empty Name, reading only that column."""
+    rows = read_rows(path, [NAME_COLUMN])
+    next(rows)
+    for index, (name,) in enumerate(rows):
+        if name is None or str(name).strip() == "":
+            continue
+        yield index, name
+
+
+def iter_company_results(path):
+    """Yields (row_index, name, website, email) like iter_companies, reading
+    Website/Email too; they are None when the sheet has no such column."""
+    rows = read_rows(path)
+    header = next(rows, [])
+    rows.close()
+    present = [column for column in RESULT_COLUMNS if column in header]
+
+    rows = read_rows(path, [NAME_COLUMN] + present)
+    columns = next(rows)
+    for index, row in enumerate(rows):
+        values = dict(zip(columns, row))
+        name = values[NAME_COLUMN]
+        if name is None or str(name).strip() == "":
+            continue
+        yield index, name, values.get('Website'), values.get('Email')
+
+
+class SheetWriter:
+    """Appends rows to a .csv, or to an .xlsx through openpyxl's write-only mode."""
+
+    def __init__(self, path):
+        self.path = path
+        if is_csv(path):
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._file)
+        else:
+            self._workbook = openpyxl.Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet("Sheet1")
+
+    def write(self, row):
+        if is_csv(self.path):
+            self._csv.writerow(["" if value is None else value for value in row])
+        else:
+            self._sheet.append([None if value == "" else value for value in row])
+
+    def close(self):
+        if is_csv(self.path):
+            self._file.close()
+        else:
+            self._workbook.save(self.path)
+
+
+def write_results(input_path, output_path, results):
+    """Copies the input sheet to output_path row by row with Website/Email filled in.
+
+    results maps row positions to {"website": ..., "email": ...}; a cell is
+    only replaced when its key is present, and the columns are added when
+    the input lacks them. The file is written under a temporary name and
+    moved into place, so a reader never sees half of it.
+    """
+    rows = read_rows(input_path)
+    header = list(next(rows, []))
+    for column in RESULT_COLUMNS:
+        if column not in header:
+            header.append(column)
+    website_col, email_col = (header.index(column) for column in RESULT_COLUMNS)
+
+    base, ext = os.path.splitext(output_path)
+    temp_path = f"{base}.tmp{ext}"
+    writer = SheetWriter(temp_path)
+    try:
+        writer.write(header)
+        for index, row in enumerate(rows):
+            row = list(row) + [""] * (len(header) - len(row))
+            values = results.get(index)
+            if values:
+                if 'website' in values:
+                    row[website_col] = values['website']
+                if 'email' in values:
+                    row[email_col] = values['email']
+            writer.write(row)
+    finally:
+        writer.close()
+    os.replace(temp_path, output_path)
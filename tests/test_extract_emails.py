@@ -0,0 +1,109 @@
+"""Parity of main.extract_emails_from_html with the original BeautifulSoup
+implementation, over the saved pages in tests/pages and a few inline cases,
+with both the lxml and the html.parser backends."""
+import re
+import sys
+from pathlib import Path
+from urllib.parse import unquote
+
+import pytest
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import main
+
+PAGES_DIR = Path(__file__).parent / 'pages'
+
+INLINE_CASES = [
+    '<p>Email info@acme.com. sales [at] acme.com</p>',
+    '<div>info@acme.com</a>London</div>',
+    '<p>info@acme.co.uk</p>',
+    '<p>hello [at] acme . com</p>',
+    '<p>john.doe @ foo.org</p><script>var e="x@y.com"</script>',
+    '<noscript>n@o.com</noscript><p>ok@fine.io.</p>',
+    '<b>info</b>@split.com',
+    '<style>.a{background:url(i@x.css)}</style><p>x [AT] Y.CO.UK</p>',
+    '<a href="MAILTO:up@case.com">x</a>',
+    '<p>foo<script>bar</script>baz@qux.com</p>',
+    '<p>x[at]y.com@z.org</p>',
+    '',
+]
+
+
+def baseline_extract_emails(html_content):
+    """extract_emails_from_html as it was before it was optimized."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    found_emails = set()
+
+    for script in soup(['script', 'style', 'noscript']):
+        script.decompose()
+
+    for a in soup.find_all('a', href=True):
+        href = a['href']
+        if href.lower().startswith('mailto:'):
+            email = unquote(href.split(':')[1].split('?')[0]).strip()
+            if email and '@' in email:
+                found_emails.add(email)
+
+    text_content = soup.get_text(separator=' ')
+
+    standard_pattern = r'\b[a-zA-Z0-9][a-zA-Z0-9._%+-]*@[a-zA-Z0-9][a-zA-Z0-9.-]*\.[a-zA-Z]{2,}\b'
+    found_emails.update(re.findall(standard_pattern, text_content, re.IGNORECASE))
+
+    dot_pattern = r'\b([a-zA-Z0-9][a-zA-Z0-9._%+-]*)\s*@\s*([a-zA-Z0-9][a-zA-Z0-9.-]*)\s*\.\s*([a-zA-Z]{2,})\b'
+    for match in re.findall(dot_pattern, html_content, re.IGNORECASE):
+        found_emails.add(f"{match[0]}@{match[1]}.{match[2]}")
+
+    at_pattern = r'\b([a-zA-Z0-9][a-zA-Z0-9._%+-]*)\s*\[\s*at\s*\]\s*([a-zA-Z0-9][a-zA-Z0-9.-]*)\s*\.\s*([a-zA-Z]{2,})\b'
+    for match in re.findall(at_pattern, html_content, re.IGNORECASE):
+        found_emails.add(f"{match[0]}@{match[1]}.{match[2]}")
+
+    clean_emails = []
+    junk_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.css', '.js', '.svg', '.webp', '.mp4', '.woff', '.woff2', '.ttf', '.eot', '.ico']
+    junk_patterns = ['sentry', 'example.com', 'domain.com', 'email.com', 'your-email', 'youremail', 'test@', '@test', 'noreply@example']
+
+    for email in found_emails:
+        email = email.lower().strip()
+        email = re.sub(r'^[.\-_]+|[.\-_]+$', '', email)
+        email = email.rstrip('.,;:')
+
+        if '@' not in email or email.count('@') > 1:
+            continue
+        if any(email.endswith(ext) for ext in junk_extensions):
+            continue
+        if any(junk in email for junk in junk_patterns):
+            continue
+        if len(email) < 6 or len(email) > 254:
+            continue
+        parts = email.split('@')
+        if len(parts) != 2 or not parts[0] or not parts[1]:
+            continue
+        if '.' not in parts[1]:
+            continue
+        clean_emails.append(email)
+
+    return list(set(clean_emails))
+
+
+def _cases():
+    pages = [pytest.param(path.read_text(encoding='utf-8'), id=path.name) for path in sorted(PAGES_DIR.glob('*.html'))]
+    return pages + [pytest.param(html, id=f"inline-{i}") for i, html in enumerate(INLINE_CASES)]
+
+
+@pytest.fixture(params=['lxml', 'html.parser'])
+def backend(request, monkeypatch):
+    if request.param == 'lxml' and main.lxml is None:
+        pytest.skip("lxml is not installed")
+    if request.param == 'html.parser':
+        monkeypatch.setattr(main, 'lxml', None)
+    return request.param
+
+
+@pytest.mark.parametrize('html', _cases())
+def test_matches_baseline(backend, html):
+    assert set(main.extract_emails_from_html(html)) == set(baseline_extract_emails(html))
+
+
+def test_corpus_has_pages_with_emails():
+    with_emails = [path for path in PAGES_DIR.glob('*.html') if baseline_extract_emails(path.read_text(encoding='utf-8'))]
+    assert len(with_emails) >= 5
@@ -0,0 +1,92 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+# Longest readiness wait per stage, in seconds; pages that are still busy
+# after this are read as they are.
+WAIT_CEILINGS = {
+    "search": 10,
+    "page": 8,
+    "contact_page": 5,
+}
+POLL_INTERVAL = 0.1
+# No new resources for this long counts as network idle.
+NETWORK_IDLE_WINDOW = 0.5
+
+_READY_SCRIPT = """
+const selectors = arguments[0];
+return [
+    document.readyState,
+    performance.getEntriesByType('resource').length,
+    selectors.length === 0 || selectors.some(s => document.querySelector(s) !== null)
+];
+"""
+
+
+def wait_until_ready(driver, selectors=(), ceiling=WAIT_CEILINGS["page"], timings=None):
+    """Waits until the page has parsed, one of selectors (if any) is present
+    and the network has been idle for NETWORK_IDLE_WINDOW, or ceiling passes.
+    A page that cannot be asked yet is polled again until the ceiling.
+
+    Returns the seconds waited; also recorded as the "wait" stage in timings.
+    """
+    start = time.monotonic()
+    deadline = start + ceiling
+    last_resources = None
+    idle_since = start
+
+    while True:
+        try:
+            state = driver.execute_script(_READY_SCRIPT, list(selectors))
+        except Exception:
+            # Usually mid-navigation, when the old document is gone and the
+            # new one is not ready for scripts yet: try again.
+            state = None
+
+        now = time.monotonic()
+        if state:
+            ready_state, resources, found = state
+            if resources != last_resources:
+                last_resources, idle_since = resources, now
+            if ready_state != "loading" and found and now - idle_since >= NETWORK_IDLE_WINDOW:
+                break
+        if now >= deadline:
+            break
+        time.sleep(POLL_INTERVAL)
+
+    waited = time.monotonic() - start
+    if timings:
+        timings.add("wait", waited)
+    return waited
+
+
+class HostPoliteness:
+    """Spaces out requests to the same host across every browser in the process.
+
+    Each request books the next free slot for its host; a worker only sleeps
+    for whatever part of the interval has not already passed since that
+    host's previous booking, so time spent elsewhere counts towards it.
+    """
+
+    def __init__(self, jitter=0.3):
+        self.jitter = jitter
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url, interval):
+        """Books a slot for url's host and returns the seconds until it starts."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        return slot - now
+
+    def wait_turn(self, url, interval, timings=None):
+        delay = self.reserve(url, interval) if interval > 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+            if timings:
+                timings.add("sleep", delay)
+        return delay
@@ -0,0 +1,159 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from main import process_workflow, OUTPUT_FILE, DEFAULT_ENRICH_MODE
+from jobs import JobStore, job_dir
+from metrics import StageHistograms
+from scheduler import MAX_BROWSERS
+
+WORKER_POLL_INTERVAL = 2
+HEARTBEAT_INTERVAL = 15
+STALE_AFTER = 120
+STOP_CHECK_INTERVAL = 2
+
+
+def run_job(job_store, job_id, file_path, city, country, pool_size, force_refresh, log_callback, emit_event, stop_check,
+            enrich_mode=DEFAULT_ENRICH_MODE):
+    """Runs one job end to end and records its outcome in the job store.
+
+    Shared by the API's inline threads and external worker processes; they
+    differ only in where log lines and the final event marker are sent.
+    """
+    output_path = os.path.join(job_dir(job_id), OUTPUT_FILE)
+    metrics = StageHistograms()
+
+    def progress_callback(processed, total):
+        job_store.update(job_id, processed=processed, total=total)
+
+    job_store.update(job_id, status="running", started_at=JobStore.now(), output_path=output_path)
+    completed = False
+
+    try:
+        log_callback(f"Starting processing for location: {city} {country}")
+        output_file = process_workflow(
+            input_file=file_path,
+            city=city,
+            country=country,
+            log_callback=log_callback,
+            stop_check=stop_check,
+            pool_size=pool_size,
+            force_refresh=force_refresh,
+            enrich_mode=enrich_mode,
+            output_file=output_path,
+            progress_callback=progress_callback,
+            metrics=metrics,
+            timings_file=os.path.join(job_dir(job_id), "timings.jsonl")
+        )
+
+        if stop_check():
+            job_store.update(job_id, status="stopped", finished_at=JobStore.now())
+            log_callback(f"Processing stopped by user! Partial results saved to: {output_file}")
+            emit_event(f"__STOPPED__{output_file}")
+        else:
+            completed = True
+            job_store.update(job_id, status="completed", finished_at=JobStore.now())
+            log_callback(f"Processing completed! Output file: {output_file}")
+            emit_event(f"__COMPLETED__{output_file}")
+
+    except Exception as e:
+        job_store.update(job_id, status="error", error=str(e), finished_at=JobStore.now())
+        log_callback(f"Error during processing: {str(e)}")
+        emit_event(f"__ERROR__{str(e)}")
+    finally:
+        job_store.update(job_id, stage_timings=json.dumps(metrics.to_dict()))
+        # Stopped or failed jobs keep their input so they can be resumed.
+        if completed:
+            try:
+                os.remove(file_path)
+            except:
+                pass
+
+
+def process_claimed_job(job_store, job):
+    job_id = job["job_id"]
+    finished = threading.Event()
+    last_stop_check = [0.0, False]
+
+    def log_callback(msg):
+        job_store.append_log(job_id, f"[{JobStore.now()}] {msg}")
+
+    def emit_event(marker):
+        job_store.append_log(job_id, marker)
+
+    def stop_check():
+        # Called before every row by every browser, so the flag is re-read
+        # from the database at most once per STOP_CHECK_INTERVAL.
+        if time.time() - last_stop_check[0] >= STOP_CHECK_INTERVAL:
+            current = job_store.get(job_id)
+            last_stop_check[:] = [time.time(), bool(current and current["stop_requested"])]
+        return last_stop_check[1]
+
+    def heartbeat():
+        while not finished.wait(HEARTBEAT_INTERVAL):
+            job_store.heartbeat(job_id)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    print(f"Claimed job {job_id} with {job['pool_size']} browser(s)")
+    if job["pool_size"] < job["requested_pool_size"]:
+        log_callback(f"Browser limit reached: starting with {job['pool_size']} of {job['requested_pool_size']} requested browser(s)")
+
+    try:
+        run_job(
+            job_store, job_id, job["input_path"], job["city"], job["country"],
+            job["pool_size"], bool(job["force_refresh"]), log_callback, emit_event, stop_check,
+            job["enrich_mode"] or DEFAULT_ENRICH_MODE
+        )
+    finally:
+        finished.set()
+
+
+def worker_loop(max_browsers=MAX_BROWSERS, poll_interval=WORKER_POLL_INTERVAL):
+    """Claims and runs queued jobs one at a time until the process is killed."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    job_store = JobStore()
+    print(f"Worker {worker_id} waiting for jobs...")
+
+    while True:
+        requeued = job_store.requeue_stale(STALE_AFTER)
+        if requeued:
+            print(f"Requeued {requeued} job(s) from unresponsive workers")
+
+        job = job_store.claim_next(worker_id, max_browsers)
+        if not job:
+            time.sleep(poll_interval)
+            continue
+        process_claimed_job(job_store, job)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run scraping jobs outside the API server process.")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes to start")
+    parser.add_argument("--max-browsers", type=int, default=MAX_BROWSERS, help="browser cap shared by all workers")
+    parser.add_argument("--poll-interval", type=float, default=WORKER_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        worker_loop(args.max_browsers, args.poll_interval)
+        return
+
+    processes = [
+        multiprocessing.Process(target=worker_loop, args=(args.max_browsers, args.poll_interval))
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == "__main__":
+    main()